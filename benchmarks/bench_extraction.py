@@ -0,0 +1,136 @@
+"""
+Micro-benchmark of the bytes based page extraction compared to the former parsing of str(content) and decoded pages.
+Reports the time and the peak of allocated memory per page.
+
+Usage: PYTHONPATH=. python benchmarks/bench_extraction.py [kind=recorded page file...]
+kind is one of garden, overview, contracts, npc_prices and market. Without files, generated pages are used.
+"""
+import io
+import json
+import re
+import sys
+import timeit
+import tracemalloc
+
+from lxml import html, etree
+
+from wurzelbot.communication import extraction
+
+
+def generated_pages():
+    products = ', '.join(['"{0}":{{"name":"Produkt&nbsp;{0}","category":"v","sx":1,"sy":1,"level":1,"crop":2,'
+                          '"plantable":1,"time":3600}}'.format(i) for i in range(1, 400)])
+    padding = '<div class="garden">' + 'x' * 200 + '</div>\n'
+    garden = ('<html><head><script>ajax.setToken("0123456789abcdef0123456789abcdef");\n'
+              'var data_products = {' + products + '};var data_other = 1;</script></head><body>'
+              + padding * 500 + '</body></html>')
+    overview = '<html><body><table>' + ''.join(
+        '<tr><td><a href="markt.php?order=p&v={}&filter=1">Produkt \'{}\'</a></td></tr>'.format(i, i)
+        for i in range(1, 300)) + '</table></body></html>'
+    contracts = '<html><body><table>' + ''.join(
+        '<tr><td>Vertrag</td><td><a onclick="anull(\'{}\');">annullieren</a></td></tr>'.format(1000 + i)
+        for i in range(50)) + '</table></body></html>'
+    npc_prices = '<html><body><div id="content"><table><tr><th><b>Produkt</b></th><th><b>Preis</b></th></tr>' + ''.join(
+        '<tr><td>Produkt {}</td><td>{},{:02d} wT</td></tr>'.format(i, i, i % 100) for i in range(400)) \
+        + '<tr><td>Gärten & Regale</td><td>1.000,00 wT</td></tr></table></div></body></html>'
+    market = '<html><body><div><table><tr><th>Anzahl</th><th>Produkt</th><th>Verkäufer</th><th>Preis</th></tr>' \
+        + ''.join(
+        '<tr><td>1.{:03d}</td><td><a>Karotte</a></td><td><a>Spieler{}</a></td><td>0,{:02d} wT</td>'
+        '<td><a onclick="buy(\'{}\',\'1{:03d}\',\'0\',\'{:02d}\',\'0.{:02d}\',\'Karotte\')">kaufen</a></td></tr>'
+        .format(i, i, i, 5000 + i, i, i, i) for i in range(50)) \
+        + '<tr><td><a href="markt.php?order=p&v=1&filter=1&page=2">weiter</a></td></tr></table></div></body></html>'
+    return [('garden', garden.encode()), ('overview', overview.encode()), ('contracts', contracts.encode()),
+            ('npc_prices', npc_prices.encode()), ('market', market.encode())]
+
+
+def old_garden(content):
+    content = content.decode('UTF-8')
+    token = re.search(r'ajax\.setToken\(\"(.*)\"\);', content)
+    products = re.search(r'data_products = ({.*}});var', content)
+    return token.group(1), json.loads(products.group(1))
+
+
+def new_garden(content):
+    return extraction.get_token(content), json.loads(extraction.get_data_products(content))
+
+
+def old_overview(content):
+    return [int(product_id) for product_id in re.findall(r'markt\.php\?order=p&v=([0-9]{1,3})&filter=1', str(content))]
+
+
+def old_contracts(content):
+    return re.findall(r'onclick="anull\(\\\'(.*?)\\\'\);"', str(content))
+
+
+def old_npc_prices(content):
+    content = content.decode('UTF-8').replace('Gärten & Regale', 'Gärten und Regale')
+    html_tree = etree.fromstring(str(content), parser=etree.HTMLParser(recover=True))
+    table = html_tree.find('./body/div[@id="content"]/table')
+    result = {}
+    for row in table.iter('tr'):
+        if row[0].text is not None and row[1].text is not None:
+            price = row[1].text[:-3].replace('.', '').replace(',', '.').strip()
+            result[row[0].text] = float(price) if len(price) > 0 else None
+    return result
+
+
+def old_market(content):
+    table = html.parse(io.BytesIO(content)).getroot().findall('./body/div/table/*')
+    offers = []
+    for i in range(1, len(table) - 1):
+        offer_id = None
+        for element in table[i].iter('a'):
+            buy = re.search(r'buy\((.*?)\)', element.get('onclick', '') + element.get('href', ''))
+            if buy is not None:
+                offer_id = buy.group(1).replace("'", '').split(',')[0]
+        offers.append(extraction.Offer(int(table[i][0].text.replace('.', '')),
+                                       float(table[i][3].text.replace('wT', '').replace('.', '').replace(',', '.')),
+                                       table[i][2][0].text, offer_id, 1))
+    pages = set()
+    for element in table[len(table) - 1].iter('a'):
+        page = re.search(r'page=([0-9]+)', element.get('href', '') + element.get('onclick', ''))
+        if page is not None:
+            pages.add(int(page.group(1)))
+    return offers, pages
+
+
+PARSERS = {
+    'garden': (old_garden, new_garden),
+    'overview': (old_overview, extraction.get_tradeable_product_ids),
+    'contracts': (old_contracts, extraction.get_contract_numbers),
+    'npc_prices': (old_npc_prices, extraction.get_npc_prices),
+    'market': (old_market, lambda content: extraction.get_offers_from_market_page(content, 1)),
+}
+
+
+def measure(parse, content, number):
+    duration = timeit.timeit(lambda: parse(content), number=number) / number
+    tracemalloc.start()
+    parse(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return duration, peak
+
+
+def main():
+    if len(sys.argv) > 1:
+        pages = []
+        for argument in sys.argv[1:]:
+            kind, path = argument.split('=', 1)
+            with open(path, 'rb') as file:
+                pages.append((kind, file.read()))
+    else:
+        pages = generated_pages()
+
+    number = 200
+    for kind, content in pages:
+        old_parse, new_parse = PARSERS[kind]
+        assert old_parse(content) == new_parse(content)
+        old_time, old_peak = measure(old_parse, content, number)
+        new_time, new_peak = measure(new_parse, content, number)
+        print('{:10} ({:7} bytes): old {:8.1f} us {:8} B peak | new {:8.1f} us {:8} B peak | speedup {:5.1f}x'
+              .format(kind, len(content), old_time * 1e6, old_peak, new_time * 1e6, new_peak, old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of the placement queries with the bit masks of the fields compared to the former nested loops over all
+positions and the tiles of the plant. Gardens are filled randomly with a fixed seed.
+
+Usage: PYTHONPATH=. python benchmarks/bench_fit_mask.py
+"""
+import random
+import timeit
+
+from wurzelbot.gardens.gardens import GARDEN_HEIGHT, GARDEN_WIDTH, Field, Garden
+
+SIZES = [(1, 1), (2, 1), (1, 2), (2, 2)]
+
+
+def generated_gardens(number, occupancy, seed=1):
+    generator = random.Random(seed)
+    gardens = []
+    for garden_id in range(1, number + 1):
+        garden = Garden(garden_id)
+        for tile in garden.garden_field.get_tiles_flat():
+            if generator.random() < occupancy:
+                tile.set_crop(object())
+        gardens.append(garden)
+    return gardens
+
+
+def old_plant_fits_at(garden, size, pos_x, pos_y):
+    for x in range(size[0]):
+        for y in range(size[1]):
+            if not garden.garden_field.tile_is_valid(pos_x + x, pos_y + y) \
+                    or not garden.garden_field.get_tile(pos_x + x, pos_y + y).is_empty():
+                return False
+    return True
+
+
+def old_can_be_planted_now(gardens, size):
+    for garden in gardens:
+        for x in range(GARDEN_WIDTH):
+            for y in range(GARDEN_HEIGHT):
+                if old_plant_fits_at(garden, size, x, y):
+                    return True
+    return False
+
+
+def new_can_be_planted_now(gardens, size):
+    return any(garden.garden_field.plant_fits(size) for garden in gardens)
+
+
+def old_fitting_tiles(gardens, size):
+    return [tile for garden in gardens for tile in garden.garden_field.get_tiles_flat()
+            if old_plant_fits_at(garden, size, tile.pos_x, tile.pos_y)]
+
+
+def new_fitting_tiles(gardens, size):
+    return [tile for garden in gardens
+            for tile in garden.garden_field.get_tiles_of_mask(Field.get_fit_mask(garden.garden_field.free_mask, size))]
+
+
+def main():
+    number = 200
+    for occupancy in [0.5, 0.9, 1.0]:
+        gardens = generated_gardens(4, occupancy)
+        for size in SIZES:
+            assert old_can_be_planted_now(gardens, size) == new_can_be_planted_now(gardens, size)
+            assert old_fitting_tiles(gardens, size) == new_fitting_tiles(gardens, size)
+            for garden in gardens:
+                for tile in garden.garden_field.get_tiles_flat():
+                    assert old_plant_fits_at(garden, size, tile.pos_x, tile.pos_y) \
+                           == garden.plant_fits_at(size, tile.pos_x, tile.pos_y)
+
+            for name, old, new in [('can_be_planted_now', old_can_be_planted_now, new_can_be_planted_now),
+                                   ('fitting tiles', old_fitting_tiles, new_fitting_tiles)]:
+                old_time = timeit.timeit(lambda: old(gardens, size), number=number) / number
+                new_time = timeit.timeit(lambda: new(gardens, size), number=number) / number
+                print('{:18} {}x{} {:3.0%} occupied: old {:8.1f} us | new {:6.1f} us | speedup {:6.1f}x'.format(
+                    name, size[0], size[1], occupancy, old_time * 1e6, new_time * 1e6, old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark of the placement planner compared to the former greedy placement in rows from the top left. Reports the
+number of placements and the planning time for randomly filled gardens with a fixed seed.
+
+Usage: PYTHONPATH=. python benchmarks/bench_placement_planner.py
+"""
+import random
+import timeit
+
+from wurzelbot.gardens.gardens import Field, Garden
+from wurzelbot.gardens.placement_planner import PlacementPlanner
+
+SIZES = [(2, 1), (1, 2), (2, 2)]
+
+
+def generated_gardens(number, occupancy, seed=1):
+    generator = random.Random(seed)
+    gardens = []
+    for garden_id in range(1, number + 1):
+        garden = Garden(garden_id)
+        for tile in garden.garden_field.get_tiles_flat():
+            if generator.random() < occupancy:
+                tile.set_crop(object())
+        gardens.append(garden)
+    return gardens
+
+
+def old_plan(gardens, size):
+    placements = []
+    for garden in gardens:
+        field = garden.garden_field
+        free_mask = field.free_mask
+        fit_mask = Field.get_fit_mask(free_mask, size)
+        while fit_mask:
+            tile = field.get_tile_of_bit(fit_mask & -fit_mask)
+            size_mask = Field.get_size_mask(tile.pos_x, tile.pos_y, size)
+            placements.append((garden, field.get_tiles_of_mask(size_mask)))
+            free_mask &= ~size_mask
+            fit_mask = Field.get_fit_mask(free_mask, size)
+    return placements
+
+
+def check(placements, size):
+    used = set()
+    for garden, tiles in placements:
+        assert len(tiles) == size[0] * size[1]
+        for tile in tiles:
+            assert tile.is_empty() and (garden.garden_id, tile.tile_id) not in used
+            used.add((garden.garden_id, tile.tile_id))
+
+
+def main():
+    number = 20
+    for occupancy in [0.1, 0.3, 0.5]:
+        gardens = generated_gardens(4, occupancy)
+        for size in SIZES:
+            old_placements = old_plan(gardens, size)
+            new_placements = PlacementPlanner.plan(gardens, size)
+            check(new_placements, size)
+            assert len(new_placements) >= len(old_placements)
+            old_time = min(timeit.repeat(lambda: old_plan(gardens, size), number=number, repeat=5)) / number
+            new_time = min(timeit.repeat(lambda: PlacementPlanner.plan(gardens, size), number=number, repeat=5)) / number
+            print('{}x{} {:3.0%} occupied: old {:3} plants {:7.2f} ms | new {:3} plants {:7.2f} ms | +{:.1%}'.format(
+                size[0], size[1], occupancy, len(old_placements), old_time * 1e3, len(new_placements), new_time * 1e3,
+                len(new_placements) / len(old_placements) - 1))
+
+
+if __name__ == '__main__':
+    main()
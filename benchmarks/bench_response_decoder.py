@@ -0,0 +1,60 @@
+"""
+Micro-benchmark of the decoder for save endpoint responses compared to the former PyYAML parsing.
+
+Usage: PYTHONPATH=. python benchmarks/bench_response_decoder.py [recorded response files...]
+Without files, generated responses in the style of save/wasser.php are used.
+"""
+import sys
+import timeit
+
+from wurzelbot.communication.response_decoder import decode_response
+
+try:
+    import yaml
+except ImportError:
+    # the comparison with PyYAML is skipped
+    yaml = None
+
+
+def generated_responses():
+    tiles = ', '.join(['"{}": [{}, 1, 1, {}, 0, 0, 0, 0, 0, "1x1", 0]'.format(i, i % 40, 1700000000 + i)
+                       for i in range(1, 205)])
+    return [
+        b'{"success":1,"water":[[1,1700000000]]}',
+        '{success: 1,\n\tgarden: {' + tiles + '},\n\tmessage: Die Pflanzen wurden gegossen}',
+        '{\n\t"success": 1,\n\t"garden": {' + tiles + '}\n}',
+        # a tab and a newline inside a quoted string
+        '{"success":1,"message":"Die Pflanzen\twurden\ngegossen"}',
+    ]
+
+
+def yaml_decode(content):
+    if isinstance(content, bytes):
+        content = content.decode('UTF-8')
+    content = content.replace('\n', ' ')
+    content = content.replace('\t', ' ')
+    return yaml.load(content, Loader=yaml.FullLoader)
+
+
+def main():
+    if len(sys.argv) > 1:
+        responses = []
+        for path in sys.argv[1:]:
+            with open(path, 'rb') as file:
+                responses.append(file.read())
+    else:
+        responses = generated_responses()
+
+    number = 200
+    for i, content in enumerate(responses):
+        fast = timeit.timeit(lambda: decode_response(content), number=number) / number
+        line = 'response {} ({} bytes): decode_response {:8.1f} us'.format(i, len(content), fast * 1e6)
+        if yaml is not None:
+            assert yaml_decode(content) == decode_response(content)
+            slow = timeit.timeit(lambda: yaml_decode(content), number=number // 10) / (number // 10)
+            line += ' | yaml {:10.1f} us | speedup {:6.1f}x'.format(slow * 1e6, slow / fast)
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
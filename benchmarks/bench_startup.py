@@ -0,0 +1,43 @@
+"""
+Startup benchmark based on python -X importtime. Every module is imported in a fresh interpreter and the cumulative
+import time of the module and its slowest imports are reported.
+
+Usage: PYTHONPATH=. python benchmarks/bench_startup.py [modules...]
+Without modules, the entry point wurzelbot.main is measured.
+"""
+import os
+import subprocess
+import sys
+
+RUNS = 5
+SLOWEST_IMPORTS = 10
+
+
+def import_times(module):
+    """Returns {imported module: cumulative microseconds} of one import of the module in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True, env=os.environ)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    modules = sys.argv[1:] or ['wurzelbot.main']
+    for module in modules:
+        # the fastest run is the least disturbed one
+        runs = [import_times(module) for _ in range(RUNS)]
+        times = min(runs, key=lambda run: run[module])
+        print('{}: {:.1f} ms (fastest of {} runs)'.format(module, times[module] / 1000, RUNS))
+        slowest = sorted(((name, cumulative) for name, cumulative in times.items() if name != module),
+                         key=lambda item: item[1], reverse=True)[:SLOWEST_IMPORTS]
+        for name, cumulative in slowest:
+            print('  {:50} {:8.1f} ms'.format(name, cumulative / 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark of the table driven parsing of the statistics table and of the login url parameters compared to the
+former per row findall and per call regexes.
+
+Usage: PYTHONPATH=. python benchmarks/bench_stats_extraction.py
+"""
+import re
+import timeit
+
+from wurzelbot.communication import extraction
+
+
+def generated_table():
+    labels = ['Name', 'Spieler-ID', 'Level', 'Punkte', 'Platz', 'Quests', 'Wasser-Quests', 'Kaktus-Quests',
+              'Echino-Quests', 'Bighead-Quests', 'Opuntia-Quests', 'Saguaro-Quests', 'Gärten', 'Ernten', 'Verkäufe',
+              'Käufe', 'Gärten', 'Gilde']
+    values = ['Spieler', '123456', '12', '1.234.567', '4.321', '345', '27', '3', '2', '1', '0', '0', '4', '9.876',
+              '543', '210', '3', 'Die&nbsp;Gärtner']
+    return ['<tr><td>{}</td><td>{}</td></tr>'.format(label, value) for label, value in zip(labels, values)]
+
+
+def old_stats(table):
+    stats = {}
+    for key, (i, var_type) in extraction.STATS_FIELDS.items():
+        stats[key] = var_type(re.findall(r'<td>(.*?)</td>', table[i])[1].replace(r'&nbsp;', ''))
+    return stats
+
+
+def old_token(url):
+    split = re.search(r'https://.*/logw.php.*token=([a-f0-9]{32})', url)
+    return split.group(1)
+
+
+def main():
+    table = generated_table()
+    url = 'https://s1.wurzelimperium.de/logw.php?port=1&unr=123456&portunr=1234567&hash=abc' \
+          '&token=0123456789abcdef0123456789abcdef'
+    assert old_stats(table) == extraction.get_stats(table)
+    assert old_token(url) == extraction.get_url_parameter('token', url)
+
+    number = 20000
+    for name, old, new in [('stats', lambda: old_stats(table), lambda: extraction.get_stats(table)),
+                           ('token', lambda: old_token(url), lambda: extraction.get_url_parameter('token', url))]:
+        old_time = timeit.timeit(old, number=number) / number
+        new_time = timeit.timeit(new, number=number) / number
+        print('{:6}: old {:6.2f} us | new {:6.2f} us | speedup {:4.1f}x'.format(
+            name, old_time * 1e6, new_time * 1e6, old_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,19 +5,19 @@ Created on 21.03.2017
 """
 import datetime
 import logging
+import os
 import sys
 import time
 
-from wurzelbot.account_data import AccountData, Login
+from wurzelbot.account_data import Login
 from wurzelbot.collector import Collector
 from wurzelbot.communication.http_communication import HTTPConnection
 from wurzelbot.gardens.garden_helper import GardenHelper
 from wurzelbot.gardens.gardener import Gardener
 from wurzelbot.gardens.gardens import GardenManager
+from wurzelbot.loader import DataLoader
 from wurzelbot.objectives.objective_manager import ObjectiveManager
-from wurzelbot.product.product_data import ProductData
 from wurzelbot.product.storage import Storage
-from wurzelbot.trading.market import Market
 from wurzelbot.trading.trader import Trader
 
 
@@ -26,21 +26,48 @@ class WurzelBot:
     Die Klasse WurzelBot übernimmt jegliche Koordination aller anstehenden Aufgaben.
     """
 
-    def __init__(self, user_name, password, server):
+    def __init__(self, user_name, password, server, session_file=None, catalog_file=None, base_url=None,
+                 record_file=None):
         self.user_name = user_name
         self.password = password
         self.server = server
+        # if a session file is given, the session is kept beyond restarts of the bot
+        self.session_file = session_file
+        # if a catalog file is given, the product catalog is kept beyond restarts of the bot
+        self.catalog_file = catalog_file
+        self.loader = DataLoader(catalog_file)
+        # if a base url is given, the bot plays on a stand-in game server instead of the game servers
+        HTTPConnection().set_base_url(base_url)
+        # if a record file is given, all requests and responses are recorded for the stand-in game server
+        HTTPConnection().set_record_file(record_file)
         self.sleeping = False
         self.terminating = False
 
     def init_bot(self):
-        # TODO: tidy up this method, maybe make loader class
         """
         Diese Methode startet und initialisiert den Wurzelbot. Dazu wird ein Login mit den
         übergebenen Logindaten durchgeführt und alles nötige initialisiert.
+        After a sleep only the data that is stale is loaded again.
         """
 
-        login_data = Login(server=self.server, user=self.user_name, password=self.password)
+        self.log_in()
+        logging.debug('loading data...')
+        self.loader.load()
+        logging.debug('loading successfull')
+
+    def log_in(self):
+        """
+        Opens a session. An open or saved session is reused as long as it is valid, otherwise a new login is done.
+        """
+        if HTTPConnection().get_remaining_session_time() > 0:
+            if HTTPConnection().is_session_valid():
+                logging.debug('reusing open session')
+                return
+            logging.debug('open session has been closed by the server')
+        # the saved session is the open one, so it is only restored if no session is open
+        elif self.session_file is not None and HTTPConnection().restore_session(self.session_file, self.server):
+            logging.debug('reusing saved session')
+            return
 
         retries = 3
         while not HTTPConnection().check_server_status(self.server):
@@ -51,37 +78,25 @@ class WurzelBot:
             logging.info("retrying in 30 minutes")
             time.sleep(1800)
 
+        login_data = Login(server=self.server, user=self.user_name, password=self.password)
         HTTPConnection().log_in(login_data)
         logging.debug('login successfull')
-        logging.debug('loading data...')
 
-        old_level = AccountData().level
-        AccountData().load_user_data()
+        if self.session_file is not None:
+            HTTPConnection().save_session(self.session_file)
 
-        new_level = AccountData().level
-        # in case of level up, recalculate the most profitable product
-        if old_level is not None and old_level < new_level:
-            Market().dispose_profitability()
-
-        AccountData().load_stats()
-
-        AccountData().load_garden_availability()
-
-        ProductData().init_products()
-
-        GardenManager().init_gardens()
-
-        Storage().load_storage(efficient_load=False)
-        Market().load_wimp_data()
-        logging.debug('loading successfull')
-
-    def exit_bot(self):
+    def exit_bot(self, keep_session=False):
         """
         Diese Methode beendet den Wurzelbot geordnet und setzt alles zurück.
+        @param keep_session: if True the session stays open, so it can be reused by the next start of the bot
         """
+        if keep_session:
+            return
         if HTTPConnection().logged_in:
             HTTPConnection().log_out()
             logging.info('logout successfull')
+        if self.session_file is not None and os.path.exists(self.session_file):
+            os.remove(self.session_file)
 
     def send_termination(self, *args):
         if self.sleeping:
@@ -94,17 +109,22 @@ class WurzelBot:
             self.terminate()
 
     def terminate(self):
-        self.exit_bot()
+        self.exit_bot(keep_session=self.session_file is not None)
         logging.info('shutting down wurzelbot')
         sys.exit()
 
-    # TODO: make a new class of this. optimize loading: not everything requires to be loaded again.
-    #  add scheduling when the bot should be woken up
+    # TODO: make a new class of this. add scheduling when the bot should be woken up
     def sleep_bot_until_next_action(self):
+        # the times of crops changed by actions are estimated, the sleep time is based on the exact ones
+        GardenManager().update_estimated()
         sleep_time = GardenManager().get_earliest_required_action() - int(time.time())
         if sleep_time <= 0:
             return
-        self.exit_bot()
+        logging.info('requests of this cycle: {}'.format(HTTPConnection().get_request_summary(reset=True)))
+        logging.debug('response cache statistics: {}'.format(HTTPConnection().get_cache_statistics()))
+        # the session is only closed if it expires while sleeping. Otherwise the next wake-up saves the login.
+        if HTTPConnection().get_remaining_session_time() <= sleep_time:
+            self.exit_bot()
         logging.info("bot sleeps for " + str(datetime.timedelta(seconds=sleep_time)))
         self.sleeping = True
         time.sleep(sleep_time)
@@ -2,9 +2,9 @@
 Created on 21.03.2017
 @author: MrFlamez
 """
-import re
 from collections import namedtuple
 
+from wurzelbot.communication import extraction
 from wurzelbot.communication.http_communication import HTTPConnection
 from wurzelbot.utils.singelton_type import SingletonType
 
@@ -40,9 +40,9 @@ class AccountData(metaclass=SingletonType):
     saguaro_quests_completed = None
 
     def load_garden_availability(self):
-        AccountData().honey_farm_available = HTTPConnection().is_honey_farm_available(AccountData().level)
-
-        AccountData().aqua_garden_available = HTTPConnection().is_aqua_garden_available(AccountData().level)
+        AccountData().honey_farm_available, AccountData().aqua_garden_available = HTTPConnection().gather(
+            HTTPConnection().is_honey_farm_available_async(AccountData().level),
+            HTTPConnection().is_aqua_garden_available_async(AccountData().level))
 
     def load_user_data(self):
         """
@@ -60,21 +60,7 @@ class AccountData(metaclass=SingletonType):
         self.daily_login_bonus = user_data['dailyloginbonus']
 
     def load_stats(self):
-        stats = HTTPConnection().get_stats()['table']
-        mapping = {
-            'user_id': (1, int),
-            'quests_completed': (5, int),
-            'aqua_quests_completed': (6, int),
-            'cactus_quests_completed': (7, int),
-            'echino_quests_completed': (8, int),
-            'bighead_quests_completed': (9, int),
-            'opuntia_quests_completed': (10, int),
-            'saguaro_quests_completed': (11, int),
-            'number_of_gardens': (16, int),
-            'guild': (17, str),
-        }
-
-        for key, value in mapping.items():
-            i, var_type = value
-            stat_value = var_type(re.findall(r'<td>(.*?)</td>', stats[i])[1].replace(r'&nbsp;', ''))
-            setattr(self, key, stat_value)
+        # the rows of the table are mapped to the attributes by extraction.STATS_FIELDS
+        stats = extraction.get_stats(HTTPConnection().get_stats()['table'])
+        for key, value in stats.items():
+            setattr(self, key, value)
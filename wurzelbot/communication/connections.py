@@ -0,0 +1,46 @@
+"""
+Connection types for httplib2 that count the bytes of the response bodies as they are received, before httplib2
+decompresses gzip or deflate encoded bodies.
+"""
+import http.client
+import threading
+
+import httplib2
+
+_received = threading.local()
+
+
+class _CountingHTTPResponse(http.client.HTTPResponse):
+    def read(self, amt=None):
+        data = super().read(amt)
+        _received.bytes = getattr(_received, 'bytes', 0) + len(data)
+        return data
+
+
+class _CountingHTTPConnection(httplib2.HTTPConnectionWithTimeout):
+    response_class = _CountingHTTPResponse
+
+
+class _CountingHTTPSConnection(httplib2.HTTPSConnectionWithTimeout):
+    response_class = _CountingHTTPResponse
+
+
+_CONNECTION_TYPES = {
+    'http': _CountingHTTPConnection,
+    'https': _CountingHTTPSConnection,
+}
+
+
+def get_connection_type(url):
+    """Returns the connection type for the scheme of an url, which has to be passed to httplib2.Http.request."""
+    return _CONNECTION_TYPES[url.split(':', 1)[0].lower()]
+
+
+def reset_received_bytes():
+    """Resets the received bytes of the current thread, which has to be done before every request."""
+    _received.bytes = 0
+
+
+def get_received_bytes():
+    """Returns the bytes of response bodies the current thread received on the wire since the last reset."""
+    return getattr(_received, 'bytes', 0)
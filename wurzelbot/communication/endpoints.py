@@ -0,0 +1,51 @@
+from enum import Enum
+
+
+class EndpointClass(Enum):
+    READ = 'read'
+    WRITE = 'write'
+    MARKET = 'market'
+
+
+# endpoints that change data on the server, all others only read data
+WRITE_ENDPOINTS = {
+    'pflanz.php', 'wasser.php', 'abriss.php', 'gardenHarvestAll', 'watergardenHarvestAll', 'watergardenCache',
+    'bees_changehiveproduct', 'bees_fill', 'bees_startflight', 'bonsai_branch_click', 'accept', 'decline',
+    'shopBuyProducts', 'dailyloginbonus_getreward', 'bigquest_entry', 'infinite_quest_entry', 'CityQuest',
+}
+# market requests are limited separately, because they are the most frequent ones in trading loops
+MARKET_ENDPOINTS = {'markt.php', 'marktstand.php'}
+# endpoints that only read data although they are requested with POST
+READ_POST_ENDPOINTS = {'updatelager.php', 'notiz.php'}
+# endpoints that are known to only read data, only their requests are retried
+# main.php isn't one of them, because it also serves the logout
+READ_ENDPOINTS = {
+    'changeGarden', 'statsGetStats', 'citymap_init', 'menu-update.php', 'updatelager.php', 'notiz.php', 'shop.php',
+    'hilfe.php', 'markt.php', 'watergardenGetGarden', 'achievements.php', 'bees_init', 'bonsai_init', 'getAreaData',
+    'bigquest_init', 'infinite_quest_get', 'overview.php',
+}
+
+
+def get_endpoint_name(address):
+    """
+    Returns the logical endpoint of an address, which is the value of the do parameter or the name of the script.
+    e.g. 'changeGarden' for 'ajax/ajax.php?do=changeGarden&garden=1' and 'pflanz.php' for 'save/pflanz.php?feld[]=1'
+    """
+    path, _, query = address.partition('?')
+    for parameter in query.split('&'):
+        if parameter.startswith('do='):
+            return parameter[3:]
+    return path.rsplit('/', 1)[-1]
+
+
+def get_endpoint_class(endpoint, method='GET'):
+    if endpoint in MARKET_ENDPOINTS:
+        return EndpointClass.MARKET
+    if endpoint in WRITE_ENDPOINTS or (method == 'POST' and endpoint not in READ_POST_ENDPOINTS):
+        return EndpointClass.WRITE
+    return EndpointClass.READ
+
+
+def is_retryable(endpoint, method='GET'):
+    """Returns True if a failed request can be repeated, because it doesn't change data on the server."""
+    return endpoint in READ_ENDPOINTS and (method == 'GET' or endpoint in READ_POST_ENDPOINTS)
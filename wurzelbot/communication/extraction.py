@@ -0,0 +1,250 @@
+"""
+Extraction of data from the pages of the game. All patterns are compiled once. Pages are parsed directly from the bytes
+of a response with byte patterns and lxml byte input, so they are neither decoded nor copied as a whole. HTML snippets
+of JSON responses, like the statistics table, are parsed with str patterns.
+lxml is imported on first use, because it is one of the slowest imports and not every entry point parses HTML.
+"""
+import re
+from collections import namedtuple
+
+
+# offer of the marketplace, the id is None for own offers, because they can't be bought
+Offer = namedtuple('Offer', 'amount price seller id page')
+
+_TOKEN_START = b'ajax.setToken("'
+_TOKEN_END = b'");'
+_DATA_PRODUCTS_START = b'data_products = {'
+_DATA_PRODUCTS_END = b'}};var'
+_TRADEABLE_PRODUCT = re.compile(rb'markt\.php\?order=p&v=([0-9]{1,3})&filter=1')
+_CONTRACT = re.compile(rb'onclick="anull\(\'(.*?)\'\);"')
+_BUY = re.compile(r'buy\((.*?)\)')
+_PAGE = re.compile(r'page=([0-9]+)')
+
+_NPC_PRICE_RENAMES = {'Gärten & Regale': 'Gärten und Regale'}
+
+# parameters of the urls that are returned by the login
+URL_PARAMETERS = {
+    'token': re.compile(r'https?://.*/logw.php.*token=([a-f0-9]{32})'),
+    'portal_token': re.compile(r'.*portal/port_logw.php.*token=([a-f0-9]{32})'),
+    'portal_unr': re.compile(r'.*portal/port_logw.php.*unr=([a-f0-9]{6}).*port'),
+    'portal_port_unr': re.compile(r'.*portal/port_logw.php.*portunr=([a-f0-9]{7})'),
+}
+
+# rows of the statistics table of the player: {attribute: (row, type)}
+STATS_FIELDS = {
+    'user_id': (1, int),
+    'quests_completed': (5, int),
+    'aqua_quests_completed': (6, int),
+    'cactus_quests_completed': (7, int),
+    'echino_quests_completed': (8, int),
+    'bighead_quests_completed': (9, int),
+    'opuntia_quests_completed': (10, int),
+    'saguaro_quests_completed': (11, int),
+    'number_of_gardens': (16, int),
+    'guild': (17, str),
+}
+# the value of a statistics row is in its second cell
+_STATS_VALUE = re.compile(r'<td>.*?</td>(?s:.*?)<td>(.*?)</td>')
+_USER_LIST_ROW = re.compile(r'<tr><td class=".*">(.*)<\/td><td class=".*tag">(.*)<\/td><td class=".*uname">([^<]*)<.*'
+                            r'class=".*pkt">(.*)<\/td><\/tr>')
+
+
+def _find_in_line(content, start_marker, end_marker, start=0):
+    """
+    Returns the start and end of the first start_marker and the last end_marker behind it in the same line or None.
+    This is the span of the greedy pattern start_marker(.*)end_marker without scanning the page with a regex.
+    """
+    start = content.find(start_marker, start)
+    if start < 0:
+        return None
+    line_end = content.find(b'\n', start)
+    if line_end < 0:
+        line_end = len(content)
+    end = content.rfind(end_marker, start + len(start_marker), line_end)
+    if end < 0:
+        return None
+    return start, end
+
+
+def get_token(content):
+    """Returns the ajax token of a page or None if the page doesn't contain one."""
+    span = _find_in_line(content, _TOKEN_START, _TOKEN_END)
+    if span is None:
+        return None
+    return content[span[0] + len(_TOKEN_START):span[1]].decode('UTF-8')
+
+
+def get_data_products(content):
+    """
+    Returns the JSON object of all products as bytes, which is assigned to data_products on the garden page.
+    Only this span of the page is copied, it can be passed to json.loads without decoding it.
+    """
+    span = _find_in_line(content, _DATA_PRODUCTS_START, _DATA_PRODUCTS_END)
+    if span is None:
+        return None
+    # the object starts with the last character of the start marker and ends with the first two of the end marker
+    return content[span[0] + len(_DATA_PRODUCTS_START) - 1:span[1] + 2]
+
+
+def get_tradeable_product_ids(content):
+    """Returns the ids of all products that are linked on the overview page of the marketplace."""
+    return [int(product_id) for product_id in _TRADEABLE_PRODUCT.findall(content)]
+
+
+def get_contract_numbers(content):
+    """Returns the numbers of all contracts that can be cancelled on the contract overview page."""
+    return [number.decode('UTF-8') for number in _CONTRACT.findall(content)]
+
+
+def get_product_ids_from_shop(content):
+    """
+    Parses the product ids of the input fields produkt_0, produkt_1, ... of a shop page in one pass.
+    The ids are returned in the order of the fields up to the first missing field.
+    """
+    from lxml import html
+    html_tree = html.fromstring(content)
+    input_fields = {}
+    for input_field in html_tree.xpath('//input[starts-with(@id, "produkt_")]'):
+        index = input_field.get('id')[len('produkt_'):]
+        if index.isdigit():
+            input_fields.setdefault(int(index), input_field.get('value'))
+    product_ids = []
+    while len(product_ids) in input_fields:
+        product_ids.append(input_fields[len(product_ids)])
+    return product_ids
+
+
+def get_npc_prices(content):
+    """Parsen aller NPC Preise aus dem HTML Skript der Spielehilfe."""
+    from lxml import etree
+    my_parser = etree.HTMLParser(recover=True, encoding='UTF-8')
+    html_tree = etree.fromstring(content, parser=my_parser)
+
+    table = html_tree.find('./body/div[@id="content"]/table')
+
+    dictResult = {}
+
+    for row in table.iter('tr'):
+
+        produktname = row[0].text
+        npc_preis = row[1].text
+
+        # Bei der Tabellenüberschrift ist der Text None
+        if produktname != None and npc_preis != None:
+            # NPC-Preis aufbereiten
+            npc_preis = str(npc_preis)
+            npc_preis = npc_preis[0:len(npc_preis) - 3]
+            npc_preis = npc_preis.replace('.', '')
+            npc_preis = npc_preis.replace(',', '.')
+            npc_preis = npc_preis.strip()
+            if len(npc_preis) == 0:
+                npc_preis = None
+            else:
+                npc_preis = float(npc_preis)
+
+            dictResult[_NPC_PRICE_RENAMES.get(produktname, produktname)] = npc_preis
+
+    return dictResult
+
+
+def get_offers_from_market_page(content, page):
+    """
+    Gibt die Angebote einer Seite des Marktplatzes und die Nummern der Seiten zurück, auf die die Seite verlinkt.
+    """
+    from lxml import html
+    root = html.document_fromstring(content)
+    table = root.findall('./body/div/table/*')
+
+    listOffers = []
+    if table[1][0].text == 'Keine Angebote':
+        pass
+    else:
+        # range von 1 bis länge-1, da erste Zeile Überschriften sind und die letzte Weiter/Zurück.
+        # Falls es mehrere seiten gibt.
+        for i in range(1, len(table) - 1):
+            anzahl = table[i][0].text
+            anzahl = anzahl.replace('.', '')
+
+            preis = table[i][3].text
+            preis = preis.replace('wT', '')
+            preis = preis.replace('.', '')
+            preis = preis.replace(',', '.')
+            # produkt = table[i][1][0].text
+            seller_name = table[i][2][0].text
+
+            offer_id = None
+            for element in table[i].iter('a'):
+                buy = _BUY.search(element.get('onclick', '') + element.get('href', ''))
+                if buy is not None:
+                    offer_id = buy.group(1).replace("'", '').split(',')[0]
+
+            listOffers.append(Offer(int(anzahl), float(preis), seller_name, offer_id, page))
+
+    # the pagination row links to the neighbouring pages and sometimes to the last page
+    linked_pages = set()
+    for element in table[len(table) - 1].iter('a'):
+        linked_page = _PAGE.search(element.get('href', '') + element.get('onclick', ''))
+        if linked_page is not None:
+            linked_pages.add(int(linked_page.group(1)))
+        elif element.text is not None and 'weiter' in element.text:
+            linked_pages.add(page + 1)
+
+    return listOffers, linked_pages
+
+
+def get_note(content):
+    """Returns the text of the note of the player."""
+    from lxml import etree
+    my_parser = etree.HTMLParser(recover=True, encoding='UTF-8')
+    html_tree = etree.fromstring(content, parser=my_parser)
+
+    note = html_tree.find('./body/form/div/textarea[@id="notiztext"]')
+    noteText = note.text
+    if noteText is None:
+        return ''
+    return noteText.strip()
+
+
+def get_url_parameter(name, url):
+    """Returns a parameter of URL_PARAMETERS from an url or None if the url doesn't contain it."""
+    match = URL_PARAMETERS[name].search(url)
+    if match is None or match.group(1) == '':
+        return None
+    return match.group(1)
+
+
+def _group_fields_by_row(fields):
+    fields_by_row = {}
+    for attribute, (row, field_type) in fields.items():
+        fields_by_row.setdefault(row, []).append((attribute, field_type))
+    return fields_by_row
+
+
+_STATS_FIELDS_BY_ROW = _group_fields_by_row(STATS_FIELDS)
+
+
+def get_stats(table, fields=None):
+    """
+    Parses the rows of the statistics table in one pass.
+    @param table: list of html rows as returned by statsGetStats
+    @param fields: {attribute: (row, type)}, STATS_FIELDS by default
+    @return: {attribute: value}
+    """
+    if fields is None:
+        fields_by_row = _STATS_FIELDS_BY_ROW
+    else:
+        fields_by_row = _group_fields_by_row(fields)
+
+    stats = {}
+    for row, html_row in enumerate(table):
+        if row not in fields_by_row:
+            continue
+        value = _STATS_VALUE.search(html_row).group(1).replace('&nbsp;', '')
+        for attribute, field_type in fields_by_row[row]:
+            stats[attribute] = field_type(value)
+    return stats
+
+
+def get_user_list_row(html_row):
+    """Returns number, guild, name and points of a row of the user list as strings."""
+    return _USER_LIST_ROW.search(html_row).groups()
@@ -4,21 +4,29 @@ Created on 21.03.2017
 @author: MrFlamez
 """
 
-import io
+import contextlib
+import functools
 import json
 import logging
 import math
+import os
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from http.cookies import SimpleCookie
 from urllib.parse import urlencode
 
 import httplib2
-import yaml
-from bs4 import BeautifulSoup
-from lxml import html, etree
 
 from wurzelbot.utils.singelton_type import SingletonType
+from . import connections, extraction
+from .endpoints import get_endpoint_class, get_endpoint_name, is_retryable
+from .rate_limiter import RateLimiter, get_retry_delay, is_throttled
+from .recorder import Recorder
+from .request_statistics import RequestStatistics
+from .response_cache import ResponseCache
+from .response_decoder import ResponseDecodeError, decode_response
 from .session import Session
 
 # Defines
@@ -26,16 +34,50 @@ HTTP_STATE_OK = 200
 HTTP_STATE_FOUND = 302  # moved temporarily
 HTTP_STATE_SERVER_ERROR = 500  # if server is offline
 SERVER_DOMAIN = 'wurzelimperium.de'
+MAX_CONCURRENT_REQUESTS = 4  # upper bound of requests that are in flight at the same time
+PLANT_CHUNK_SIZE = 25  # number of plants that are planted with one request
+WATER_CHUNK_SIZE = 25  # number of plants that are watered with one request
+MAX_RETRIES = 3  # retries of requests that don't change data, if the server is throttling or unavailable
+
+# cached read-only endpoints and the seconds their responses stay valid
+CACHE_GARDEN = 'changeGarden'
+CACHE_INVENTORY = 'updatelager'
+CACHE_USER_DATA = 'menu-update'
+CACHE_STATS = 'statsGetStats'
+CACHE_CITYMAP = 'citymap_init'
+CACHE_MAIN_PAGE = 'main'
+CACHE_EXPIRATION_TIMES = {
+    CACHE_GARDEN: 300,
+    CACHE_INVENTORY: 300,
+    CACHE_USER_DATA: 60,
+    CACHE_STATS: 600,
+    CACHE_CITYMAP: 600,
+    # the game page of the login is reused by the first load of the products
+    CACHE_MAIN_PAGE: 60,
+}
 
 
 class HTTPConnection(metaclass=SingletonType):
     """Mit der Klasse HTTPConnection werden alle anfallenden HTTP-Verbindungen verarbeitet."""
 
     def __init__(self):
-        self.__webclient = httplib2.Http(disable_ssl_certificate_validation=True)
-        self.__webclient.follow_redirects = False
+        # httplib2.Http is not thread safe, therefore every thread gets its own client
+        self.__local = threading.local()
+        self.__executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix='http')
         self.__userAgent = 'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36 Vivaldi/2.2.1388.37'
         self.__Session = Session()
+        self.__cache = ResponseCache(CACHE_EXPIRATION_TIMES)
+        self.__rate_limiter = RateLimiter()
+        self.__statistics = RequestStatistics()
+        # url of a stand-in game server, None for the game servers
+        self.__base_url = None
+        # records all requests and responses if set
+        self.__recorder = None
+        # garden that is active on the server, None if unknown
+        self.__active_garden = None
+        self.__garden_changes = 0
+        self.__pending_garden_changes = 0
+        self.__garden_lock = threading.Lock()
         self.__token = None
         self.__userID = None
         self.__cookie = None
@@ -53,21 +95,189 @@ class HTTPConnection(metaclass=SingletonType):
     ############################
     # General helper functions #
     ############################
+    def __get_webclient(self):
+        """Returns the http client of the current thread."""
+        webclient = getattr(self.__local, 'webclient', None)
+        if webclient is None:
+            webclient = httplib2.Http(disable_ssl_certificate_validation=True)
+            webclient.follow_redirects = False
+            self.__local.webclient = webclient
+        return webclient
+
+    def __request(self, url, method, body, headers, endpoint):
+        """Sends a request with the http client of the current thread and records its statistics."""
+        self.__set_parsed_endpoint(endpoint)
+        connections.reset_received_bytes()
+        start_time = time.monotonic()
+        try:
+            # the connection type counts the received bytes before the content is decompressed
+            response, content = self.__get_webclient().request(url, method, body, headers,
+                                                               connection_type=connections.get_connection_type(url))
+        except (OSError, httplib2.HttpLib2Error):
+            self.__statistics.record_request(endpoint, time.monotonic() - start_time, 0, True,
+                                             connections.get_received_bytes())
+            raise
+        self.__statistics.record_request(endpoint, time.monotonic() - start_time, len(content),
+                                         int(response['status']) >= 400, connections.get_received_bytes())
+        if self.__recorder is not None:
+            self.__recorder.record(endpoint, url, method, body, response, content)
+        return response, content
+
+    def __set_parsed_endpoint(self, endpoint):
+        """
+        Sets the endpoint of the response that is parsed next by the current thread. It is set for every request and
+        for every response that is taken from the cache, so parse times and errors are assigned to the right endpoint.
+        """
+        self.__local.endpoint = endpoint
+
+    @contextlib.contextmanager
+    def __parsing(self):
+        """
+        Measures the time to parse the last response of the current thread. Responses that can't be parsed are counted
+        as errors.
+        """
+        start_time = time.monotonic()
+        endpoint = getattr(self.__local, 'endpoint', None)
+        try:
+            yield
+        except Exception:
+            if endpoint is not None:
+                self.__statistics.record_error(endpoint)
+            raise
+        finally:
+            if endpoint is not None:
+                self.__statistics.record_parse_time(endpoint, time.monotonic() - start_time)
+
+    def get_request_statistics(self):
+        """Returns count, latency percentiles, response bytes, parse time and errors per endpoint."""
+        return self.__statistics.get_snapshot()
+
+    def get_request_summary(self, reset=False):
+        """
+        Returns a one line summary of all requests.
+        @param reset: if True the statistics are reset afterwards, e.g. to start a new cycle of the bot
+        """
+        summary = self.__statistics.get_summary()
+        if reset:
+            self.__statistics.reset()
+        return summary
+
     def __send_request(self, address, method='GET', body=None, headers=None):
         url = self.__get_url() + address
         if headers is None:
             headers = self.__get_header()
         else:
             headers = {**self.__get_header(), **headers}
-        return self.__webclient.request(url, method, body, headers)
+
+        endpoint = get_endpoint_name(address)
+        endpoint_class = get_endpoint_class(endpoint, method)
+        # only requests that are known to not change data can be repeated safely
+        retries = MAX_RETRIES if is_retryable(endpoint, method) else 0
+        attempt = 0
+        while True:
+            self.__rate_limiter.acquire(endpoint_class)
+            start_time = time.monotonic()
+            retry_after = None
+            try:
+                response, content = self.__request(url, method, body, headers, endpoint)
+            except (OSError, httplib2.HttpLib2Error):
+                self.__rate_limiter.report(endpoint_class, None, time.monotonic() - start_time)
+                if attempt >= retries:
+                    raise
+            else:
+                status = int(response['status'])
+                self.__rate_limiter.report(endpoint_class, status, time.monotonic() - start_time)
+                if not is_throttled(status) or attempt >= retries:
+                    return response, content
+                if str(response.get('retry-after', '')).isdigit():
+                    retry_after = int(response['retry-after'])
+
+            delay = get_retry_delay(attempt, retry_after)
+            logging.debug('retrying {} in {:.1f}s'.format(endpoint, delay))
+            time.sleep(delay)
+            attempt += 1
+
+    def set_base_url(self, base_url):
+        """
+        Sends all requests to another server, e.g. the stand-in game server of wurzelbot.simulation.
+        @param base_url: url like 'http://localhost:8080/' or None for the game servers
+        """
+        if base_url is not None and not base_url.endswith('/'):
+            base_url += '/'
+        self.__base_url = base_url
+
+    def set_record_file(self, file_path):
+        """
+        Appends all requests and their responses to a recording file, which can be replayed by the stand-in game
+        server. None stops recording.
+        """
+        self.__recorder = None if file_path is None else Recorder(file_path)
+
+    def set_rate_limit(self, endpoint_class, rate):
+        """
+        Sets the maximal requests per second of an endpoint class. The actual rate is adapted to the server below it.
+        @param endpoint_class: EndpointClass
+        @param rate: requests per second
+        """
+        self.__rate_limiter.set_rate(endpoint_class, rate)
+
+    def __send_cached_request(self, endpoint, key, address, method='GET'):
+        """
+        Sends a read-only request or returns the cached response of an earlier request.
+        Concurrent callers of the same request share one request.
+        """
+        response, content = self.__cache.get_or_load(endpoint, key,
+                                                     lambda: self.__send_request(address, method),
+                                                     lambda response, content: response['status'] == str(HTTP_STATE_OK))
+        # the response might have been loaded by an earlier request or by another thread
+        self.__set_parsed_endpoint(get_endpoint_name(address))
+        return response, content
+
+    def __invalidate_cache(self, *endpoints, key=None):
+        """Invalidates cached responses after a request changed data on the server."""
+        for endpoint in endpoints:
+            self.__cache.invalidate(endpoint, key)
+
+    def get_cache_statistics(self):
+        """Returns hits and misses of the response cache per endpoint."""
+        return self.__cache.get_statistics()
+
+    async def __run_async(self, func, *args):
+        """Runs a blocking request function in the request thread pool."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(func, *args))
+
+    def gather(self, *awaitables):
+        """
+        Runs independent awaitable requests concurrently and returns their results in the given order.
+        At most MAX_CONCURRENT_REQUESTS requests are in flight at the same time.
+        """
+        # asyncio is imported on first use, because only the loading of data runs requests concurrently
+        import asyncio
+
+        async def run():
+            return await asyncio.gather(*awaitables)
+
+        return asyncio.run(run())
 
     def __get_header(self):
         headers = {'Cookie': 'PHPSESSID={};wunr={}'.format(self.__Session.getSessionID(), self.__userID),
-                   'Connection': 'Keep-Alive'}
+                   'Connection': 'Keep-Alive',
+                   'Accept-Encoding': 'gzip, deflate'}
         return headers
 
-    def __get_url(self):
-        return 'http://s{}.{}/'.format(self.__Session.getServer(), SERVER_DOMAIN)
+    def __get_url(self, server=None):
+        if self.__base_url is not None:
+            return self.__base_url
+        if server is None:
+            server = self.__Session.getServer()
+        return 'http://s{}.{}/'.format(server, SERVER_DOMAIN)
+
+    def __get_login_url(self):
+        if self.__base_url is not None:
+            return self.__base_url + 'dispatch.php'
+        return 'https://www.{}/dispatch.php'.format(SERVER_DOMAIN)
 
     def __check_http_ok(self, response):
         """Prüft, ob der Status der HTTP Anfrage OK ist."""
@@ -83,7 +293,8 @@ class HTTPConnection(metaclass=SingletonType):
 
     def __generate_json_and_check_success(self, content):
         """Aufbereitung und Prüfung der vom Server empfangenen JSON Daten."""
-        j_content = json.loads(content)
+        with self.__parsing():
+            j_content = json.loads(content)
         if j_content['success'] == 1:
             return j_content
         else:
@@ -92,84 +303,37 @@ class HTTPConnection(metaclass=SingletonType):
 
     def __generate_json_and_check_ok(self, content: str):
         """Aufbereitung und Prüfung der vom Server empfangenen JSON Daten."""
-        j_content = json.loads(content)
+        with self.__parsing():
+            j_content = json.loads(content)
         if j_content['status'] == 'ok':
             return j_content
         else:
             logging.debug(j_content)
             raise JSONError('json content is not ok')
 
+    def __get_from_url(self, parameter, url):
+        """Ermittelt einen Parameter aus extraction.URL_PARAMETERS aus einer übergebenen URL."""
+        value = extraction.get_url_parameter(parameter, url)
+        if value is None:
+            logging.debug(url)
+            raise JSONError('Fehler bei der Ermittlung des tokens')
+        return value
+
     def __get_token_from_url(self, url):
         """Ermittelt aus einer übergebenen URL den security token."""
-        split = re.search(r'https://.*/logw.php.*token=([a-f0-9]{32})', url)
-        iErr = 0
-        tmpToken = ''
-        if split:
-            tmpToken = split.group(1)
-            if tmpToken == '':
-                iErr = 1
-        else:
-            iErr = 1
-
-        if iErr == 1:
-            logging.debug(tmpToken)
-            raise JSONError('Fehler bei der Ermittlung des tokens')
-        else:
-            self.__token = tmpToken
+        self.__token = self.__get_from_url('token', url)
 
     def __get_token_from_url_port(self, url):
         """Ermittelt aus einer übergebenen URL den security token."""
-        split = re.search(r'.*portal/port_logw.php.*token=([a-f0-9]{32})', url)
-        iErr = 0
-        tmpToken = ''
-        if split:
-            tmpToken = split.group(1)
-            if (tmpToken == ''):
-                iErr = 1
-        else:
-            iErr = 1
-
-        if (iErr == 1):
-            logging.debug(tmpToken)
-            raise JSONError('Fehler bei der Ermittlung des tokens')
-        else:
-            self.__token = tmpToken
+        self.__token = self.__get_from_url('portal_token', url)
 
     def __get_unr_from_url_port(self, url):
-        """Ermittelt aus einer übergebenen URL den security token."""
-        split = re.search(r'.*portal/port_logw.php.*unr=([a-f0-9]{6}).*port', url)
-        iErr = 0
-        tmpunr = ''
-        if split:
-            tmpunr = split.group(1)
-            if (tmpunr == ''):
-                iErr = 1
-        else:
-            iErr = 1
-
-        if (iErr == 1):
-            logging.debug(tmpunr)
-            raise JSONError(f'Fehler bei der Ermittlung des tokens')
-        else:
-            self.__unr = tmpunr
+        """Ermittelt aus einer übergebenen URL die unr."""
+        self.__unr = self.__get_from_url('portal_unr', url)
 
     def __get_port_unr_from_url_port(self, url):
-        """Ermittelt aus einer übergebenen URL den security token."""
-        split = re.search(r'.*portal/port_logw.php.*portunr=([a-f0-9]{7})', url)
-        iErr = 0
-        tmpportunr = ''
-        if split:
-            tmpportunr = split.group(1)
-            if (tmpportunr == ''):
-                iErr = 1
-        else:
-            iErr = 1
-
-        if (iErr == 1):
-            logging.debug(tmpportunr)
-            raise JSONError('Fehler bei der Ermittlung des tokens')
-        else:
-            self.__portunr = tmpportunr
+        """Ermittelt aus einer übergebenen URL die portunr."""
+        self.__portunr = self.__get_from_url('portal_port_unr', url)
 
     def __check_session_deleted(self, cookie):
         """Prüft, ob die Session gelöscht wurde."""
@@ -177,23 +341,28 @@ class HTTPConnection(metaclass=SingletonType):
             logging.debug('SessionID: ' + cookie['PHPSESSID'].value)
             raise HTTPRequestError('Session wurde nicht gelöscht')
 
-    def __generate_yaml_content_and_check_for_success(self, content: str):
+    def __generate_yaml_content_and_check_for_success(self, content):
         """Aufbereitung und Prüfung der vom Server empfangenen YAML Daten auf Erfolg."""
-        content = content.replace('\n', ' ')
-        content = content.replace('\t', ' ')
-        yContent = yaml.load(content, Loader=yaml.FullLoader)
+        with self.__parsing():
+            yContent = decode_response(content)
+            # an answer that isn't an object, like an error page, doesn't tell if the request succeeded
+            if not isinstance(yContent, dict):
+                raise ResponseDecodeError('YAML content is not an object')
 
-        if yContent['success'] != 1:
-            raise YAMLError()
+        if yContent.get('success') != 1:
+            raise YAMLError('YAML content is not successful')
+        return yContent
 
     def __generate_yaml_content_and_check_status_for_ok(self, content):
         """Aufbereitung und Prüfung der vom Server empfangenen YAML Daten auf iO Status."""
-        content = content.replace('\n', ' ')
-        content = content.replace('\t', ' ')
-        yContent = yaml.load(content, Loader=yaml.FullLoader)
+        with self.__parsing():
+            yContent = decode_response(content)
+            if not isinstance(yContent, dict):
+                raise ResponseDecodeError('YAML content is not an object')
 
-        if yContent['status'] != 'ok':
-            raise YAMLError()
+        if yContent.get('status') != 'ok':
+            raise YAMLError('YAML content is not ok')
+        return yContent
 
     # general actions
     def log_in(self, loginDaten):
@@ -206,21 +375,41 @@ class HTTPConnection(metaclass=SingletonType):
         headers = {'Content-type': 'application/x-www-form-urlencoded',
                    'Connection': 'keep-alive'}
 
-        response, content = self.__webclient.request('https://www.{}/dispatch.php'.format(SERVER_DOMAIN),
-                                                     'POST',
-                                                     parameter,
-                                                     headers)
+        response, content = self.__request(self.__get_login_url(),
+                                           'POST',
+                                           parameter,
+                                           headers,
+                                           'dispatch.php')
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         self.__get_token_from_url(jContent['url'])
-        response, content = self.__webclient.request(jContent['url'], 'GET', headers=headers)
+        response, content = self.__request(jContent['url'], 'GET', None, headers, 'logw.php')
         self.__check_http_found(response)
         cookie = SimpleCookie(response['set-cookie'])
         cookie.load(str(response["set-cookie"]).replace("secure, ", "", -1))
+        self.__cache.clear()
+        self.__set_active_garden(None)
         self.__Session.openSession(cookie['PHPSESSID'].value, str(loginDaten.server), SERVER_DOMAIN)
         self.__cookie = cookie
         self.__userID = cookie['wunr'].value
         self.logged_in = True
+        self.__refresh_token()
+
+    def __refresh_token(self):
+        """
+        Übernimmt den security token der Spielseite. It replaces the token of the login url and is valid for all ajax
+        requests of the session.
+        """
+        content = self.__get_main_page()
+        with self.__parsing():
+            token = extraction.get_token(content)
+        if token is not None:
+            self.__token = token
+
+    def __get_main_page(self):
+        response, content = self.__send_cached_request(CACHE_MAIN_PAGE, None, 'main.php?page=garden')
+        self.__check_http_ok(response)
+        return content
 
     def log_out(self):
         """Logout des Spielers inkl. Löschen der Session."""
@@ -228,11 +417,78 @@ class HTTPConnection(metaclass=SingletonType):
         self.__check_http_found(response)
         cookie = SimpleCookie(response['set-cookie'])
         self.__check_session_deleted(cookie)
+        self.__cache.clear()
+        self.__set_active_garden(None)
         self.logged_in = False
 
+    def get_server(self):
+        return self.__Session.getServer()
+
+    def get_remaining_session_time(self):
+        """Returns the seconds until the session has to be renewed by a new login."""
+        if not self.logged_in:
+            return 0
+        return self.__Session.getRemainingTime()
+
+    def save_session(self, file_path):
+        """Saves the data of the open session to a file, so it can be reused by restore_session."""
+        session_data = {'session_id': self.__Session.getSessionID(),
+                        'server': self.__Session.getServer(),
+                        'start_time': self.__Session.getStartTime(),
+                        'user_id': self.__userID,
+                        'token': self.__token}
+        # the session data is enough to act as the logged in player, so only the owner may read the file
+        with os.fdopen(os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+            json.dump(session_data, file)
+        # a file of an earlier version keeps its mode when it is opened
+        os.chmod(file_path, 0o600)
+
+    def restore_session(self, file_path, server):
+        """
+        Restores a session saved by save_session if it is still valid.
+        @return: True if the session could be restored, otherwise a new login is required
+        """
+        try:
+            with open(file_path) as file:
+                session_data = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        if session_data.get('server') != str(server):
+            return False
+
+        self.__cache.clear()
+        self.__set_active_garden(None)
+        self.__Session.restoreSession(session_data['session_id'], session_data['server'], SERVER_DOMAIN,
+                                      session_data['start_time'])
+        if self.__Session.getRemainingTime() <= 0:
+            return False
+        self.__userID = session_data['user_id']
+        self.__token = session_data['token']
+        self.logged_in = True
+        if not self.is_session_valid():
+            logging.debug('saved session is not valid anymore')
+            return False
+        return True
+
+    def is_session_valid(self):
+        """
+        Asks the server if the session is still open, because it may have been closed on server side before it expired.
+        If it isn't valid, the connection is logged out and a new login is required.
+        """
+        if not self.logged_in:
+            return False
+        # the check needs a response of the server, the user data is reused by the next load of the bot
+        self.__invalidate_cache(CACHE_USER_DATA)
+        try:
+            self.read_user_data_from_server()
+        except (HTTPStateError, JSONError, KeyError, ValueError):
+            self.logged_in = False
+            return False
+        return True
+
     def check_server_status(self, server):
-        url = 'http://s{}.{}/'.format(server, SERVER_DOMAIN)
-        response, content = self.__webclient.request(url, 'GET', None, None)
+        response, content = self.__request(self.__get_url(server), 'GET', None, None, 'server_status')
         return response['status'] != str(HTTP_STATE_SERVER_ERROR)
 
 
@@ -259,16 +515,11 @@ class HTTPConnection(metaclass=SingletonType):
         address = 'stadt/shop.php?s={}'.format(shop_id)
         response, content = self.__send_request(address)
         self.__check_http_ok(response)
-        soup = BeautifulSoup(content, 'html.parser')
-        product_ids = []
-        i = 0
-        while True:
-            input_field = soup.find(id='produkt_{}'.format(i))
-            if input_field is None:
-                break
-            i += 1
-            product_ids.append(input_field['value'])
-        return product_ids
+        with self.__parsing():
+            return extraction.get_product_ids_from_shop(content)
+
+    async def get_product_ids_from_shop_async(self, shop_id):
+        return await self.__run_async(self.get_product_ids_from_shop, shop_id)
 
     def get_info_from_stats(self, info):
         """
@@ -281,25 +532,46 @@ class HTTPConnection(metaclass=SingletonType):
     def get_stats(self):
         address = 'ajax/ajax.php?do=statsGetStats&which=0&start=0' \
                   '&additional={}&token={}'.format(self.__userID, self.__token)
-        response, content = self.__send_request(address)
+        response, content = self.__send_cached_request(CACHE_STATS, None, address)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content.decode('UTF-8'))
         return jContent
 
-    def get_garden_info(self):
-        address = '/ajax/ajax.php?do=citymap_init&token={}'.format(self.__token)
-        response, content = self.__send_request(address)
+    async def get_stats_async(self):
+        return await self.__run_async(self.get_stats)
+
+    def get_citymap(self):
+        """
+        Returns the citymap data. It is a shared snapshot for all location checks that is reloaded after
+        CACHE_EXPIRATION_TIMES[CACHE_CITYMAP] seconds.
+        """
+        address = 'ajax/ajax.php?do=citymap_init&token={}'.format(self.__token)
+        response, content = self.__send_cached_request(CACHE_CITYMAP, None, address)
         self.__check_http_ok(response)
-        jContent = self.__generate_json_and_check_ok(content.decode('UTF-8'))
+        jContent = self.__generate_json_and_check_ok(content)
         return jContent['data']
 
+    def __is_location_bought(self, location):
+        """Checks with the citymap if a location like the bee farm has been bought."""
+        locations = self.get_citymap()['location']
+        return location in locations and locations[location].get('bought') == 1
+
+    def get_garden_info(self):
+        return self.get_citymap()
+
+    async def get_garden_info_async(self):
+        return await self.__run_async(self.get_garden_info)
+
     def read_user_data_from_server(self):
         """Ruft eine Updatefunktion im Spiel auf und verarbeitet die empfangenen userdaten."""
-        response, content = self.__send_request('ajax/menu-update.php')
+        response, content = self.__send_cached_request(CACHE_USER_DATA, None, 'ajax/menu-update.php')
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_success(content)
         return jContent
 
+    async def read_user_data_from_server_async(self):
+        return await self.__run_async(self.read_user_data_from_server)
+
     # TODO: I don't know what this is, maybe redo or remove
     def get_user_list(self, iStart, iEnd):
         """
@@ -327,13 +599,11 @@ class HTTPConnection(metaclass=SingletonType):
             self.__check_http_ok(response)
             jContent = self.__generate_json_and_check_ok(content)
             for j in jContent['table']:
-                result = re.search(
-                    r'<tr><td class=".*">(.*)<\/td><td class=".*tag">(.*)<\/td><td class=".*uname">([^<]*)<.*class=".*pkt">(.*)<\/td><\/tr>',
-                    j)
-                userList['Nr'].append(str(result.group(1)).replace('.', ''))
-                userList['Gilde'].append(str(result.group(2)))
-                userList['Name'].append(str(result.group(3).encode('utf-8')).replace('&nbsp;', ''))
-                userList['Punkte'].append(int(str(result.group(4).replace('.', ''))))
+                nr, guild, name, points = extraction.get_user_list_row(j)
+                userList['Nr'].append(nr.replace('.', ''))
+                userList['Gilde'].append(guild)
+                userList['Name'].append(str(name.encode('utf-8')).replace('&nbsp;', ''))
+                userList['Punkte'].append(int(points.replace('.', '')))
 
             iStartCorr = iStartCorr + 100
 
@@ -380,48 +650,192 @@ class HTTPConnection(metaclass=SingletonType):
 
         return plantsToBeWatered
 
+    def get_active_garden(self):
+        """Returns the id of the garden that is active on the server or None if it is unknown."""
+        return self.__active_garden
+
+    def __set_active_garden(self, garden_id):
+        with self.__garden_lock:
+            self.__active_garden = garden_id
+
+    def __send_change_garden_request(self, garden_id):
+        """
+        Sends a changeGarden request and keeps track of the active garden. If garden changes overlap, the order
+        in which the server handles them is unknown and so is the active garden.
+        """
+        with self.__garden_lock:
+            overlapping = self.__pending_garden_changes > 0
+            self.__garden_changes += 1
+            self.__pending_garden_changes += 1
+            change_number = self.__garden_changes
+            self.__active_garden = None
+        response = None
+        try:
+            address = 'ajax/ajax.php?do=changeGarden&garden={}&token={}'.format(str(garden_id), str(self.__token))
+            response, content = self.__send_request(address)
+            return response, content
+        finally:
+            with self.__garden_lock:
+                self.__pending_garden_changes -= 1
+                if not overlapping and change_number == self.__garden_changes and response is not None \
+                        and response['status'] == str(HTTP_STATE_OK):
+                    self.__active_garden = garden_id
+
+    def __reset_active_garden_if_changed_by(self, garden_id):
+        """
+        Requests with a garden parameter, like planting or watering, might change the active garden on the server.
+        """
+        if self.__active_garden != garden_id:
+            self.__set_active_garden(None)
+
     def _change_garden(self, gardenID):
-        """Wechselt den Garten."""
-        address = 'ajax/ajax.php?do=changeGarden&garden={}&token={}'.format(str(gardenID), self.__token)
-        response, content = self.__send_request(address)
+        """
+        Wechselt den Garten. The response contains the garden data, so it is reused by get_garden_data.
+        """
+        if self.__active_garden == gardenID:
+            return
+        response, content = self.__send_change_garden_request(gardenID)
         self.__check_http_ok(response)
         self.__generate_json_and_check_ok(content)
+        self.__cache.put(CACHE_GARDEN, gardenID, response, content)
 
     def get_garden_data(self, garden_id):
         """
         Gibt alle Daten zu einem Garten roh zurück.
         """
-        address = 'ajax/ajax.php?do=changeGarden&garden={}&token={}'.format(str(garden_id), str(self.__token))
-        response, content = self.__send_request(address)
+        response, content = self.__cache.get_or_load(
+            CACHE_GARDEN, garden_id, lambda: self.__send_change_garden_request(garden_id),
+            lambda response, content: response['status'] == str(HTTP_STATE_OK))
+        self.__set_parsed_endpoint('changeGarden')
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         return jContent
 
+    async def get_garden_data_async(self, garden_id):
+        return await self.__run_async(self.get_garden_data, garden_id)
+
     def water_plant_in_garden(self, iGarten, iField, sFieldsToWater):
         """Bewässert die Pflanze iField mit der Größe sSize im Garten iGarten."""
-        fields = ','.join([str(field) for field in sFieldsToWater])
-        address = 'save/wasser.php?feld[]={}&felder[]={}&cid={}&garden={}' \
-            .format(str(iField), fields, self.__token, str(iGarten))
+        if len(self.water_plants_in_garden(iGarten, [(iField, sFieldsToWater)])) == 0:
+            raise YAMLError('plant on field {} in garden {} could not be watered'.format(iField, iGarten))
+
+    def water_plants_in_garden(self, garden_id, plants, chunk_size=WATER_CHUNK_SIZE):
+        """
+        Waters multiple plants in a garden with one request per chunk of plants.
+        If a chunk fails, its plants are watered one by one.
+        @param plants: list of (field, fields) tuples, fields are all fields the plant occupies
+        @return: list of plants that have been watered
+        """
+        watered = []
+        for i in range(0, len(plants), chunk_size):
+            chunk = plants[i:i + chunk_size]
+            try:
+                self.__water_plants_chunk(garden_id, chunk)
+                watered.extend(chunk)
+            except (HTTPStateError, YAMLError, ResponseDecodeError):
+                if len(chunk) == 1:
+                    logging.debug('watering field {} in garden {} failed'.format(chunk[0][0], garden_id))
+                    continue
+                watered.extend(self.water_plants_in_garden(garden_id, chunk, 1))
+        return watered
+
+    def __water_plants_chunk(self, garden_id, plants):
+        """Sends one watering request for all plants."""
+        parameters = ''.join(['feld[]={}&felder[]={}&'.format(
+            str(field), ','.join([str(tile) for tile in fields])) for field, fields in plants])
+        address = 'save/wasser.php?{}cid={}&garden={}'.format(parameters, self.__token, str(garden_id))
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_GARDEN, key=garden_id)
+        self.__reset_active_garden_if_changed_by(garden_id)
         self.__check_http_ok(response)
-        self.__generate_yaml_content_and_check_for_success(content.decode('UTF-8'))
+        self.__generate_yaml_content_and_check_for_success(content)
 
     def harvest_garden(self, gardenID):
         """Erntet alle fertigen Pflanzen im Garten."""
         self._change_garden(gardenID)
         address = 'ajax/ajax.php?do=gardenHarvestAll&token={}'.format(self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA, CACHE_STATS)
+        self.__invalidate_cache(CACHE_GARDEN, key=gardenID)
+        self.__check_http_ok(response)
+        return self.__generate_json_and_check_ok(content)
 
     def grow_plant(self, field, plant, gardenID, fields):
         """Baut eine Pflanze auf einem Feld an."""
-        address = 'save/pflanz.php?pflanze[]={}&feld[]={}&felder[]={}&cid={}&garden={}' \
-            .format(str(plant), str(field), ','.join([str(field) for field in fields]), self.__token, str(gardenID))
+        return len(self.grow_plants(gardenID, [(field, plant, fields)])) == 1
+
+    def grow_plants(self, garden_id, placements, chunk_size=PLANT_CHUNK_SIZE):
+        """
+        Plants multiple plants in a garden with one request per chunk of placements.
+        If the server answers that a chunk failed, its placements are planted one by one. If the answer can't be
+        read, the result is unknown and the chunk might have been planted anyway. Then the result is taken from the
+        reloaded garden instead of planting the chunk again.
+        @param placements: list of (field, plant, fields) tuples, fields are all fields the plant occupies
+        @return: list of placements that have been planted
+        """
+        planted = []
+        for i in range(0, len(placements), chunk_size):
+            chunk = placements[i:i + chunk_size]
+            try:
+                planted.extend(self.__grow_plants_chunk(garden_id, chunk))
+            except YAMLError:
+                if len(chunk) == 1:
+                    logging.debug('planting on field {} in garden {} failed'.format(chunk[0][0], garden_id))
+                    continue
+                planted.extend(self.grow_plants(garden_id, chunk, 1))
+            except (HTTPStateError, ResponseDecodeError):
+                logging.debug('result of planting in garden {} is unknown, the garden is reloaded'.format(garden_id))
+                planted.extend(self.__find_planted_placements(garden_id, chunk))
+        return planted
+
+    def __find_planted_placements(self, garden_id, placements):
+        """
+        Returns the placements whose plant is on its field in the reloaded garden. The fields were empty when the
+        placements were planned, so a plant on them has been planted by the request.
+        """
+        garden = self.get_garden_data(garden_id)['garden']
+        return [placement for placement in placements
+                if str(placement[0]) in garden and int(garden[str(placement[0])][0]) == int(placement[1])]
+
+    def __grow_plants_chunk(self, garden_id, placements):
+        """Sends one planting request for all placements and returns the placements that have been planted."""
+        parameters = ''.join(['pflanze[]={}&feld[]={}&felder[]={}&'.format(
+            str(plant), str(field), ','.join([str(tile) for tile in fields])) for field, plant, fields in placements])
+        address = 'save/pflanz.php?{}cid={}&garden={}'.format(parameters, self.__token, str(garden_id))
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY)
+        self.__invalidate_cache(CACHE_GARDEN, key=garden_id)
+        self.__reset_active_garden_if_changed_by(garden_id)
+        self.__check_http_ok(response)
+        yContent = self.__generate_yaml_content_and_check_for_success(content)
+
+        # the answer isn't documented by the game. If it doesn't list the grown plants, a successful answer counts the
+        # whole chunk as planted.
+        planted_fields = self.__find_planted_fields_from_content(yContent)
+        if planted_fields is None:
+            return placements
+        return [placement for placement in placements if int(placement[0]) in planted_fields]
+
+    def __find_planted_fields_from_content(self, content):
+        """
+        Returns the fields that are stated as grown in the response of a planting request or None if the response
+        doesn't list them. The list 'grow' contains [field, plant] for every grown plant.
+        A list that can't be read leaves the result unknown and raises ResponseDecodeError.
+        """
+        grow = content.get('grow')
+        if not isinstance(grow, list):
+            return None
+        try:
+            return set([int(entry[0]) for entry in grow])
+        except (IndexError, KeyError, TypeError, ValueError) as error:
+            raise ResponseDecodeError('grown plants can not be read: {}'.format(error)) from error
 
     def remove_weed(self, garden_id, field_id):
         """Befreit ein Feld im Garten von Unkraut."""
         self._change_garden(garden_id)
         response, content = self.__send_request('save/abriss.php?tile={}'.format(field_id), 'GET')
+        self.__invalidate_cache(CACHE_USER_DATA)
+        self.__invalidate_cache(CACHE_GARDEN, key=garden_id)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_success(content)
         return jContent['success']
@@ -451,23 +865,42 @@ class HTTPConnection(metaclass=SingletonType):
 
     def water_plant_in_aqua_garden(self, iField, sFieldsToWater):
         """Gießt alle Pflanzen im Wassergarten"""
-        listFieldsToWater = sFieldsToWater.split(',')
+        if len(self.water_plants_in_aqua_garden([sFieldsToWater.split(',')])) == 0:
+            raise HTTPStateError('plant on field {} in aqua garden could not be watered'.format(iField))
 
-        sFields = ''
-        for i in listFieldsToWater:
-            sFields += '&water[]={}'.format(i)
-
-        address = 'ajax/ajax.php?do=watergardenCache{}&token={}'.format(sFields, self.__token)
-        response, content = self.__send_request(address)
-        self.__check_http_ok(response)
+    def water_plants_in_aqua_garden(self, plants, chunk_size=WATER_CHUNK_SIZE):
+        """
+        Waters multiple plants in the aqua garden with one request per chunk of plants.
+        If a chunk fails, its plants are watered one by one.
+        @param plants: list of lists with all fields of a plant
+        @return: list of plants that have been watered
+        """
+        watered = []
+        for i in range(0, len(plants), chunk_size):
+            chunk = plants[i:i + chunk_size]
+            sFields = ''.join(['&water[]={}'.format(field) for fields in chunk for field in fields])
+            address = 'ajax/ajax.php?do=watergardenCache{}&token={}'.format(sFields, self.__token)
+            response, content = self.__send_request(address)
+            try:
+                self.__check_http_ok(response)
+                watered.extend(chunk)
+            except HTTPStateError:
+                if len(chunk) == 1:
+                    logging.debug('watering fields {} in aqua garden failed'.format(chunk[0]))
+                    continue
+                watered.extend(self.water_plants_in_aqua_garden(chunk, 1))
+        return watered
 
     def is_aqua_garden_available(self, iUserLevel):
         """
         Funktion ermittelt, ob ein Wassergarten verfügbar ist.
         Dazu muss ein Mindestlevel von 19 erreicht sein und dieser dann freigeschaltet sein.
-        Die Freischaltung wird anhand der Errungenschaften im Spiel geprüft.
+        Die Freischaltung wird anhand der Citymap oder der Errungenschaften im Spiel geprüft.
         """
         if not (iUserLevel < 19):
+            locations = self.get_citymap()['location']
+            if 'watergarden' in locations:
+                return locations['watergarden'].get('bought') == 1
             response, content = self.__send_request('ajax/achievements.php?token={}'.format(self.__token))
             self.__check_http_ok(response)
             jContent = self.__generate_json_and_check_ok(content)
@@ -476,6 +909,9 @@ class HTTPConnection(metaclass=SingletonType):
         else:
             return False
 
+    async def is_aqua_garden_available_async(self, iUserLevel):
+        return await self.__run_async(self.is_aqua_garden_available, iUserLevel)
+
     # TODO: check if required (should be deprecated because of new garden presentation)
     def get_empty_fields_aqua(self):
         address = 'ajax/ajax.php?do=watergardenGetGarden&token={}'.format(self.__token)
@@ -489,19 +925,20 @@ class HTTPConnection(metaclass=SingletonType):
         """Erntet alle fertigen Pflanzen im Garten."""
         address = 'ajax/ajax.php?do=watergardenHarvestAll&token={}'.format(self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA, CACHE_STATS)
         self.__check_http_ok(response)
 
     def grow_aqua_plant(self, plant, field):
         """Baut eine Pflanze im Wassergarten an."""
-        headers = self.__get_header()
-        server = self.__get_url()
-        adresse = '{}ajax/ajax.php?do=watergardenCache&plant[{}]={}&token={}'.format(server, plant, field, self.__token)
-        response, content = self.__webclient.request(adresse, 'GET', headers=headers)
+        address = 'ajax/ajax.php?do=watergardenCache&plant[{}]={}&token={}'.format(plant, field, self.__token)
+        response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY)
 
     def remove_weed_on_field_in_aqua_garden(self, gardenID, fieldID):
         """Befreit ein Feld im Garten von Unkraut."""
         self._change_garden(gardenID)
         response, content = self.__send_request('save/abriss.php?tile={}'.format(fieldID), 'POST')
+        self.__invalidate_cache(CACHE_USER_DATA)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_success(content)
         return jContent['success']
@@ -509,13 +946,13 @@ class HTTPConnection(metaclass=SingletonType):
     # bee farm
     def is_honey_farm_available(self, iUserLevel):
         if not (iUserLevel < 10):
-            response, content = self.__send_request('ajax/ajax.php?do=citymap_init&token={}'.format(self.__token))
-            self.__check_http_ok(response)
-            jContent = self.__generate_json_and_check_ok(content)
-            return jContent['data']['location']['bees']['bought'] == 1
+            return self.__is_location_bought('bees')
         else:
             return False
 
+    async def is_honey_farm_available_async(self, iUserLevel):
+        return await self.__run_async(self.is_honey_farm_available, iUserLevel)
+
     # TODO: merge __get_available_hives and __get_hive_type
     def __get_available_hives(self, jContent):
         """Sucht im JSON Content nach verfügbaren Bienenstöcken und gibt diese zurück."""
@@ -562,11 +999,13 @@ class HTTPConnection(metaclass=SingletonType):
         address = 'ajax/ajax.php?do=bees_changehiveproduct&id={}' \
                   '&pid={}&token={}'.format(str(hive), str(Questanforderung), self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY)
         self.__check_http_ok(response)
 
     def harvest_bees(self):
         """Erntet den vollen Honigtopf"""
         response, content = self.__send_request('ajax/ajax.php?do=bees_fill&token={}'.format(self.__token))
+        self.__invalidate_cache(CACHE_INVENTORY)
         self.__check_http_ok(response)
 
     def send_bees(self, hive):
@@ -581,12 +1020,7 @@ class HTTPConnection(metaclass=SingletonType):
         if iUserLevel < 10:
             return False
 
-        response, content = self.__send_request('ajax/ajax.php?do=citymap_init&token={}'.format(self.__token))
-        self.__check_http_ok(response)
-        jContent = self.__generate_json_and_check_ok(content)
-        location = jContent['data']['location']
-        bought_bonsai = jContent['data']['location']['bonsai']['bought']
-        return 'bonsai' in location and bought_bonsai == 1
+        return self.__is_location_bought('bonsai')
 
     def __get_available_bonsai_slots(self, jContent):
         """Sucht im JSON Content nach verfügbaren bonsai und gibt diese zurück."""
@@ -618,6 +1052,7 @@ class HTTPConnection(metaclass=SingletonType):
         address = 'ajax/ajax.php?do=bonsai_branch_click&slot={}' \
                   '&scissor={}&cache=%5B1%5D&token={}'.format(str(tree), str(sissor), self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY)
         self.__check_http_ok(response)
 
     ###########
@@ -654,6 +1089,7 @@ class HTTPConnection(metaclass=SingletonType):
         """
         address = 'ajax/verkaufajax.php?do=accept&id={}&token={}'.format(wimp_id, self.__token)
         response, content = self.__send_request(address, 'POST')
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA, CACHE_STATS)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         return jContent['newProductCounts']
@@ -671,46 +1107,15 @@ class HTTPConnection(metaclass=SingletonType):
         return jContent['action']
 
     # Shops
-    def __parse_npc_prices_from_html(self, html_data):
-        """Parsen aller NPC Preise aus dem HTML Skript der Spielehilfe."""
-        # ElementTree benötigt eine Datei zum Parsen.
-        # Mit BytesIO wird eine Datei im Speicher angelegt, nicht auf der Festplatte.
-        my_parser = etree.HTMLParser(recover=True)
-        html_tree = etree.fromstring(str(html_data), parser=my_parser)
-
-        table = html_tree.find('./body/div[@id="content"]/table')
-
-        dictResult = {}
-
-        for row in table.iter('tr'):
-
-            produktname = row[0].text
-            npc_preis = row[1].text
-
-            # Bei der Tabellenüberschrift ist der Text None
-            if produktname != None and npc_preis != None:
-                # NPC-Preis aufbereiten
-                npc_preis = str(npc_preis)
-                npc_preis = npc_preis[0:len(npc_preis) - 3]
-                npc_preis = npc_preis.replace('.', '')
-                npc_preis = npc_preis.replace(',', '.')
-                npc_preis = npc_preis.strip()
-                if len(npc_preis) == 0:
-                    npc_preis = None
-                else:
-                    npc_preis = float(npc_preis)
-
-                dictResult[produktname] = npc_preis
-
-        return dictResult
-
     def get_npc_prices(self):
         """Ermittelt aus der Wurzelimperium-Hilfe die NPC Preise aller Produkte."""
         response, content = self.__send_request('hilfe.php?item=2')
         self.__check_http_ok(response)
-        content = content.decode('UTF-8').replace('Gärten & Regale', 'Gärten und Regale')
-        dictNPCPrices = self.__parse_npc_prices_from_html(content)
-        return dictNPCPrices
+        with self.__parsing():
+            return extraction.get_npc_prices(content)
+
+    async def get_npc_prices_async(self):
+        return await self.__run_async(self.get_npc_prices)
 
     def buy_from_shop(self, shop: int, productId: int, amount: int = 1):
         parameter = urlencode({'s': shop,
@@ -721,6 +1126,7 @@ class HTTPConnection(metaclass=SingletonType):
                                })
         header = {'Content-Type': 'application/x-www-form-urlencoded'}
         response, content = self.__send_request('stadt/shop.php?s={}'.format(shop), 'POST', parameter, header)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
 
     def buy_from_aqua_shop(self, productId: int, amount: int = 1):
@@ -728,85 +1134,71 @@ class HTTPConnection(metaclass=SingletonType):
             .format(productId, amount, self.__token)
 
         response, content = self.__send_request(f'{adresse}')
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
 
     # marketplace
-    def get_offers_from_product(self, prod_id):
-        """Gibt eine Liste mit allen Angeboten eines Produkts zurück."""
-        nextPage = True
-        iPage = 1
-        listOffers = []
-        while nextPage:
-            nextPage = False
-            address = 'stadt/markt.php?order=p&v={}&filter=1&page={}'.format(str(prod_id), str(iPage))
-            response, content = self.__send_request(address)
-            self.__check_http_ok(response)
-
-            html_file = io.BytesIO(content)
-            html_tree = html.parse(html_file)
-            root = html_tree.getroot()
-            table = root.findall('./body/div/table/*')
-
-            if table[1][0].text == 'Keine Angebote':
-                pass
-            else:
-                # range von 1 bis länge-1, da erste Zeile Überschriften sind und die letzte Weiter/Zurück.
-                # Falls es mehrere seiten gibt.
-                for i in range(1, len(table) - 1):
-                    anzahl = table[i][0].text
-                    anzahl = anzahl.replace('.', '')
-
-                    preis = table[i][3].text
-                    preis = preis.replace('wT', '')
-                    preis = preis.replace('.', '')
-                    preis = preis.replace(',', '.')
-                    # produkt = table[i][1][0].text
-                    seller_name = table[i][2][0].text
-
-                    listOffers.append((int(anzahl), float(preis), seller_name))
-
-                for element in table[len(table) - 1][0]:
-                    if 'weiter' in element.text:
-                        nextPage = True
-                        iPage = iPage + 1
-
-        return listOffers
-
-    def get_cheapest_offers_for(self, product):
-        """ returns only the first page of offers for a certain product from the marketplace """
-        list_offers = []
-        address = 'stadt/markt.php?order=p&v={}&filter=1&page={}'.format(str(product.id), 1)
+    def __get_offers_from_page(self, prod_id, page):
+        """
+        Gibt die Angebote einer Seite des Marktplatzes und die Nummern der Seiten zurück, auf die die Seite verlinkt.
+        """
+        address = 'stadt/markt.php?order=p&v={}&filter=1&page={}'.format(str(prod_id), str(page))
         response, content = self.__send_request(address)
         self.__check_http_ok(response)
 
-        matches = re.findall(r'buy\((.*?)\)', str(content))
-        for match in matches:
-            attributes = match.replace("\\'", "").split(',')
-            list_offers.append({
-                'id': attributes[0],
-                'amount': int(attributes[1]),
-                'price_verbose': "{},{}".format(attributes[2], attributes[3]),
-                'price': float(attributes[-2]),
-                'product_name': attributes[-1]
-            })
+        with self.__parsing():
+            return extraction.get_offers_from_market_page(content, page)
+
+    def get_offers_from_product(self, prod_id):
+        """
+        Gibt eine Liste mit allen Angeboten eines Produkts zurück, sortiert nach Preis.
+        Alle Seiten bis zur höchsten verlinkten Seite werden gleichzeitig geladen. If the pages only link their
+        neighbours, the newly linked pages are loaded until no unseen page is linked.
+        """
+        listOffers, linked_pages = self.__get_offers_from_page(prod_id, 1)
+        loaded_pages = {1}
+        while True:
+            pages = [page for page in range(2, max(linked_pages, default=1) + 1) if page not in loaded_pages]
+            if len(pages) == 0:
+                break
+            results = self.gather(*[self.__run_async(self.__get_offers_from_page, prod_id, page) for page in pages])
+            loaded_pages.update(pages)
+            for offers, page_links in results:
+                listOffers.extend(offers)
+                linked_pages.update(page_links)
+        # the pages are sorted by price, but offers can move between pages while they are loaded
+        listOffers.sort(key=lambda offer: offer.price)
+        return listOffers
 
-        return list_offers
+    def iter_offers_from_product(self, prod_id):
+        """
+        Gibt die Angebote eines Produkts nach Preis sortiert zurück. Die Seiten werden erst geladen, wenn die Angebote
+        der vorherigen Seite verbraucht sind, so dass ein Abbruch weitere Anfragen spart.
+        """
+        page = 1
+        while True:
+            offers, linked_pages = self.__get_offers_from_page(prod_id, page)
+            yield from offers
+            if len([linked_page for linked_page in linked_pages if linked_page > page]) == 0:
+                return
+            page += 1
 
     def buy_from_marketplace(self, product, offer, quantity):
         header = {'Content-Type': 'application/x-www-form-urlencoded'}
         parameter = urlencode({
             'buy_menge': quantity,
             'buy_now': 'kaufen',
-            'buy_max': offer.get('amount'),
-            'buy_id': offer.get('id'),
-            'buy_price': offer.get('price'),
+            'buy_max': offer.amount,
+            'buy_id': offer.id,
+            'buy_price': offer.price,
             'markt_buy_nr': '',
-            'page': 1,
+            'page': offer.page,
             'order': 'p',
             'v': product.id,
             'filter': 1
         })
         response, content = self.__send_request('stadt/markt.php', 'POST', parameter, header)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
 
     def sell_to_marketplace(self, product, quantity, price):
@@ -820,6 +1212,7 @@ class HTTPConnection(metaclass=SingletonType):
             'verkaufe_markt': 'OK',
         })
         response, content = self.__send_request('stadt/marktstand.php', 'POST', parameter, header)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
 
     ######################
@@ -832,6 +1225,7 @@ class HTTPConnection(metaclass=SingletonType):
         """
         address = 'ajax/ajax.php?do=dailyloginbonus_getreward&day={}&token={}'.format(day, self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
         return self.__generate_json_and_check_ok(content)
 
@@ -850,15 +1244,14 @@ class HTTPConnection(metaclass=SingletonType):
         address = 'ajax/ajax.php?do=bigquest_entry&id={}&questid={}&pid={}&amount={}&token={}' \
             .format(year_id, quest_id, product.id, quantity, self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         return jContent['data']
 
     def init_infinity_quest(self):
-        headers = self.__get_header()
-        server = self.__get_url()
-        adresse = '{}ajax/ajax.php?do=infinite_quest_get&token={}'.format(server, self.__token)
-        response, content = self.__webclient.request(adresse, 'GET', headers=headers)
+        address = 'ajax/ajax.php?do=infinite_quest_get&token={}'.format(self.__token)
+        response, content = self.__send_request(address)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         return jContent
@@ -867,6 +1260,7 @@ class HTTPConnection(metaclass=SingletonType):
         address = 'ajax/ajax.php?do=infinite_quest_entry&pid={}' \
                   '&amount={}&questnr={}&token={}'.format(product, amount, questnr, self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         return jContent
@@ -881,6 +1275,7 @@ class HTTPConnection(metaclass=SingletonType):
     def send_city_quest(self):
         address = 'ajax/ajax.php?do=CityQuest&action=send&token={}'.format(self.__token)
         response, content = self.__send_request(address)
+        self.__invalidate_cache(CACHE_INVENTORY, CACHE_USER_DATA)
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         return jContent['data']
@@ -929,46 +1324,41 @@ class HTTPConnection(metaclass=SingletonType):
         """Get the users note"""
         response, content = self.__send_request('notiz.php', 'POST')
         self.__check_http_ok(response)
-        content = content.decode('UTF-8')
-        my_parser = etree.HTMLParser(recover=True)
-        html_tree = etree.fromstring(content, parser=my_parser)
-
-        note = html_tree.find('./body/form/div/textarea[@id="notiztext"]')
-        noteText = note.text
-        if noteText is None:
-            return ''
-        return noteText.strip()
+        with self.__parsing():
+            return extraction.get_note(content)
 
     ########################
     # Products and Storage #
     ########################
     def get_all_product_informations(self):
-        """Sammelt alle Produktinformationen und gibt diese zur Weiterverarbeitung zurück."""
-        response, content = self.__send_request('main.php?page=garden')
-        content = content.decode('UTF-8')
-        self.__check_http_ok(response)
-        reToken = re.search(r'ajax\.setToken\(\"(.*)\"\);', content)
-        self.__token = reToken.group(1)
-        reProducts = re.search(r'data_products = ({.*}});var', content)
-        return reProducts.group(1)
+        """
+        Sammelt alle Produktinformationen und gibt diese als JSON bytes zur Weiterverarbeitung zurück.
+        The security token is taken from the same page after every login.
+        """
+        content = self.__get_main_page()
+        with self.__parsing():
+            return extraction.get_data_products(content)
 
     def get_inventory(self, shelf_type):
         """Ermittelt den Lagerbestand und gibt diesen zurück."""
         address = 'ajax/updatelager.php?all=1&sort=1&type={}&token={}'.format(shelf_type, self.__token)
-        response, content = self.__send_request(address, 'POST')
+        response, content = self.__send_cached_request(CACHE_INVENTORY, shelf_type, address, 'POST')
         self.__check_http_ok(response)
         jContent = self.__generate_json_and_check_ok(content)
         return jContent
 
+    async def get_inventory_async(self, shelf_type):
+        return await self.__run_async(self.get_inventory, shelf_type)
+
     def get_all_tradeable_products_from_overview(self):
         """Gibt eine Liste zurück, welche Produkte handelbar sind."""
         response, content = self.__send_request('stadt/markt.php?show=overview')
         self.__check_http_ok(response)
-        tradeableProducts = re.findall(r'markt\.php\?order=p&v=([0-9]{1,3})&filter=1', str(content))
-        for i in range(0, len(tradeableProducts)):
-            tradeableProducts[i] = int(tradeableProducts[i])
+        with self.__parsing():
+            return extraction.get_tradeable_product_ids(content)
 
-        return tradeableProducts
+    async def get_all_tradeable_products_from_overview_async(self):
+        return await self.__run_async(self.get_all_tradeable_products_from_overview)
 
     def create_contract(self, player_name, product_data):
         parameter_dict = {'contract_to': player_name,
@@ -981,16 +1371,19 @@ class HTTPConnection(metaclass=SingletonType):
         parameter = urlencode(parameter_dict)
         header = {'Content-Type': 'application/x-www-form-urlencoded'}
         response, content = self.__send_request('vertraege/new.php', 'POST', parameter, header)
+        self.__invalidate_cache(CACHE_INVENTORY)
         self.__check_http_ok(response)
 
     def cancel_all_contracts(self):
         response, content = self.__send_request('vertraege/overview.php')
-        anull_numbers = re.findall(r'onclick="anull\(\\\'(.*?)\\\'\);"', str(content))
+        with self.__parsing():
+            anull_numbers = extraction.get_contract_numbers(content)
         header = {'Content-Type': 'application/x-www-form-urlencoded'}
 
         for anull_number in anull_numbers:
             parameter = urlencode({'anull_nr': anull_number})
             response, content = self.__send_request('vertraege/overview.php', 'POST', parameter, header)
+            self.__invalidate_cache(CACHE_INVENTORY)
             self.__check_http_ok(response)
 
 
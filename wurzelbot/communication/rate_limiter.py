@@ -0,0 +1,142 @@
+import logging
+import random
+import threading
+import time
+
+from .endpoints import EndpointClass
+
+# requests per second of each endpoint class
+DEFAULT_RATES = {
+    EndpointClass.READ: 8.0,
+    EndpointClass.WRITE: 4.0,
+    EndpointClass.MARKET: 4.0,
+}
+MIN_RATE = 0.2
+BURST = 4  # requests that can be sent at once after a pause
+DECREASE_FACTOR = 0.5  # on throttling or server errors
+LATENCY_DECREASE_FACTOR = 0.8  # on rising latency
+INCREASE_STEP = 0.1  # requests per second that are added after every successful request
+LATENCY_FACTOR = 2.0  # latency is rising if it exceeds this factor of the baseline
+DECREASE_INTERVAL = 2.0  # minimal seconds between two decreases, so one burst of errors counts once
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+
+class TokenBucket:
+    """Token bucket that allows rate requests per second with bursts of up to capacity requests."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__last_update = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__last_update) * self.rate)
+        self.__last_update = now
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self.__lock:
+                self.__refill()
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+                wait_time = (1 - self.__tokens) / self.rate
+            time.sleep(wait_time)
+
+    def set_rate(self, rate):
+        with self.__lock:
+            self.__refill()
+            self.rate = rate
+
+
+class _AdaptiveRate:
+    """Rate of an endpoint class that is adapted to the responses of the server."""
+
+    def __init__(self, max_rate):
+        self.max_rate = max_rate
+        self.bucket = TokenBucket(max_rate, BURST)
+        self.latency = None
+        self.baseline_latency = None
+        self.last_decrease = 0
+
+
+class RateLimiter:
+    """
+    Limits the request rate per endpoint class. The rate is reduced if the server responds with 429 or 5xx or if the
+    latency rises and it is increased again up to the configured rate with every successful request.
+    """
+
+    def __init__(self, rates=None):
+        if rates is None:
+            rates = DEFAULT_RATES
+        self.__rates = {endpoint_class: _AdaptiveRate(rate) for endpoint_class, rate in rates.items()}
+        self.__lock = threading.Lock()
+
+    def set_rate(self, endpoint_class, rate):
+        """Sets the maximal requests per second of an endpoint class."""
+        adaptive_rate = self.__rates[endpoint_class]
+        with self.__lock:
+            adaptive_rate.max_rate = rate
+            adaptive_rate.bucket.set_rate(min(adaptive_rate.bucket.rate, rate))
+
+    def get_rate(self, endpoint_class):
+        """Returns the current requests per second of an endpoint class."""
+        return self.__rates[endpoint_class].bucket.rate
+
+    def acquire(self, endpoint_class):
+        self.__rates[endpoint_class].bucket.acquire()
+
+    def report(self, endpoint_class, status, latency):
+        """
+        Adapts the rate of an endpoint class to the result of a request.
+        @param status: HTTP status or None if the request failed without response
+        @param latency: seconds until the response was received
+        """
+        adaptive_rate = self.__rates[endpoint_class]
+        with self.__lock:
+            if status is None or is_throttled(status):
+                self.__decrease(endpoint_class, adaptive_rate, DECREASE_FACTOR, 'status {}'.format(status))
+                return
+
+            if adaptive_rate.latency is None:
+                adaptive_rate.latency = latency
+                adaptive_rate.baseline_latency = latency
+            adaptive_rate.latency = 0.8 * adaptive_rate.latency + 0.2 * latency
+            # the baseline follows falling latencies immediately and rising latencies slowly
+            if adaptive_rate.latency < adaptive_rate.baseline_latency:
+                adaptive_rate.baseline_latency = adaptive_rate.latency
+            else:
+                adaptive_rate.baseline_latency = 0.99 * adaptive_rate.baseline_latency + 0.01 * adaptive_rate.latency
+
+            if adaptive_rate.latency > LATENCY_FACTOR * adaptive_rate.baseline_latency:
+                self.__decrease(endpoint_class, adaptive_rate, LATENCY_DECREASE_FACTOR,
+                                'latency of {:.2f}s'.format(adaptive_rate.latency))
+            elif adaptive_rate.bucket.rate < adaptive_rate.max_rate:
+                adaptive_rate.bucket.set_rate(min(adaptive_rate.max_rate, adaptive_rate.bucket.rate + INCREASE_STEP))
+
+    def __decrease(self, endpoint_class, adaptive_rate, factor, reason):
+        now = time.monotonic()
+        if now - adaptive_rate.last_decrease < DECREASE_INTERVAL:
+            return
+        adaptive_rate.last_decrease = now
+        rate = max(MIN_RATE, adaptive_rate.bucket.rate * factor)
+        adaptive_rate.bucket.set_rate(rate)
+        logging.debug('{} requests are reduced to {:.2f}/s because of {}'.format(endpoint_class.value, rate, reason))
+
+
+def is_throttled(status):
+    """Checks if the server asks to slow down or can't handle the request at the moment."""
+    return status == 429 or status >= 500
+
+
+def get_retry_delay(attempt, retry_after=None):
+    """Returns the jittered exponential delay before the retry with the given number, starting at 0."""
+    if retry_after is not None:
+        return retry_after
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return random.uniform(delay / 2, delay)
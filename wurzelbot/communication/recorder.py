@@ -0,0 +1,60 @@
+"""
+Recording of requests and responses, which can be replayed by the stand-in game server (wurzelbot.simulation).
+Every exchange is appended as one JSON line to the recording file.
+"""
+import base64
+import json
+import threading
+from urllib.parse import parse_qsl, urlencode
+
+# logins are simulated by the stand-in server, they are not recorded, because they contain the credentials
+UNRECORDED_ENDPOINTS = {'dispatch.php', 'logw.php', 'server_status'}
+# body parameters that are replaced before an exchange is recorded
+REDACTED_PARAMETERS = {'pass'}
+# response headers that are recorded, cookies are left out on purpose
+RECORDED_HEADERS = ('content-type', 'location')
+
+
+class Recorder:
+    """Appends request/response pairs to a recording file. It is shared by all request threads."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.__lock = threading.Lock()
+
+    def record(self, endpoint, url, method, body, response, content):
+        if endpoint in UNRECORDED_ENDPOINTS:
+            return
+        exchange = {
+            'endpoint': endpoint,
+            'method': method,
+            'url': url,
+            'body': _redact(body),
+            'status': int(response['status']),
+            'headers': {name: response[name] for name in RECORDED_HEADERS if name in response},
+            'content': base64.b64encode(content).decode('ascii'),
+        }
+        line = json.dumps(exchange, ensure_ascii=False) + '\n'
+        with self.__lock:
+            with open(self.file_path, 'a', encoding='UTF-8') as file:
+                file.write(line)
+
+
+def _redact(body):
+    if body is None:
+        return None
+    parameters = parse_qsl(body, keep_blank_values=True)
+    return urlencode([(key, 'redacted' if key in REDACTED_PARAMETERS else value) for key, value in parameters])
+
+
+def read_recording(file_path):
+    """Returns the recorded exchanges of a recording file in the order they were recorded."""
+    exchanges = []
+    with open(file_path, encoding='UTF-8') as file:
+        for line in file:
+            if line.strip() == '':
+                continue
+            exchange = json.loads(line)
+            exchange['content'] = base64.b64decode(exchange['content'])
+            exchanges.append(exchange)
+    return exchanges
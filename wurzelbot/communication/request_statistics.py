@@ -0,0 +1,104 @@
+import threading
+
+
+class _EndpointStatistics:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latencies = []
+        self.response_bytes = 0
+        self.wire_bytes = 0
+        self.parse_time = 0.0
+
+
+class RequestStatistics:
+    """
+    Collects count, latency, response size, parse time and errors of the requests per logical endpoint.
+    """
+
+    def __init__(self):
+        self.__endpoints = {}
+        self.__lock = threading.Lock()
+
+    def __get(self, endpoint):
+        statistics = self.__endpoints.get(endpoint)
+        if statistics is None:
+            statistics = _EndpointStatistics()
+            self.__endpoints[endpoint] = statistics
+        return statistics
+
+    def record_request(self, endpoint, latency, response_bytes, error=False, wire_bytes=None):
+        """
+        @param response_bytes: size of the decoded content
+        @param wire_bytes: size of the content as it was received, which is smaller if it was compressed
+        """
+        if wire_bytes is None:
+            wire_bytes = response_bytes
+        with self.__lock:
+            statistics = self.__get(endpoint)
+            statistics.count += 1
+            statistics.latencies.append(latency)
+            statistics.response_bytes += response_bytes
+            statistics.wire_bytes += wire_bytes
+            if error:
+                statistics.errors += 1
+
+    def record_parse_time(self, endpoint, parse_time):
+        with self.__lock:
+            self.__get(endpoint).parse_time += parse_time
+
+    def record_error(self, endpoint):
+        with self.__lock:
+            self.__get(endpoint).errors += 1
+
+    def get_snapshot(self):
+        """
+        Returns the statistics of every endpoint:
+        {endpoint: {'count', 'errors', 'latency_p50', 'latency_p90', 'latency_p99', 'latency_total',
+                    'response_bytes', 'wire_bytes', 'parse_time'}}
+        """
+        with self.__lock:
+            snapshot = {}
+            for endpoint, statistics in self.__endpoints.items():
+                latencies = sorted(statistics.latencies)
+                snapshot[endpoint] = {
+                    'count': statistics.count,
+                    'errors': statistics.errors,
+                    'latency_p50': _percentile(latencies, 50),
+                    'latency_p90': _percentile(latencies, 90),
+                    'latency_p99': _percentile(latencies, 99),
+                    'latency_total': sum(latencies),
+                    'response_bytes': statistics.response_bytes,
+                    'wire_bytes': statistics.wire_bytes,
+                    'parse_time': statistics.parse_time,
+                }
+            return snapshot
+
+    def reset(self):
+        with self.__lock:
+            self.__endpoints = {}
+
+    def get_summary(self):
+        """Returns a one line summary of the requests, ordered by total latency."""
+        snapshot = self.get_snapshot()
+        if len(snapshot) == 0:
+            return 'no requests'
+        total_count = sum([statistics['count'] for statistics in snapshot.values()])
+        total_bytes = sum([statistics['response_bytes'] for statistics in snapshot.values()])
+        total_wire_bytes = sum([statistics['wire_bytes'] for statistics in snapshot.values()])
+        total_latency = sum([statistics['latency_total'] for statistics in snapshot.values()])
+        endpoints = sorted(snapshot.items(), key=lambda item: item[1]['latency_total'], reverse=True)
+        details = ', '.join(['{} {}x p50={:.0f}ms p90={:.0f}ms {}kB ({}kB wire) parse={:.0f}ms{}'.format(
+            endpoint, statistics['count'], statistics['latency_p50'] * 1000, statistics['latency_p90'] * 1000,
+            statistics['response_bytes'] // 1024, statistics['wire_bytes'] // 1024, statistics['parse_time'] * 1000,
+            ' errors={}'.format(statistics['errors']) if statistics['errors'] > 0 else '')
+            for endpoint, statistics in endpoints])
+        return '{} requests, {}kB ({}kB wire), {:.1f}s: {}'.format(total_count, total_bytes // 1024,
+                                                                  total_wire_bytes // 1024, total_latency, details)
+
+
+def _percentile(sorted_values, percent):
+    if len(sorted_values) == 0:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
@@ -0,0 +1,98 @@
+import threading
+import time
+
+
+class ResponseCache:
+    """
+    Caches the raw responses of read-only requests. Every endpoint has its own expiration time and the entries of an
+    endpoint are separated by a key, e.g. the garden id. Requests that change data on the server must invalidate the
+    affected entries.
+    Concurrent requests of the same entry are coalesced, so only one of them is sent to the server.
+    """
+
+    def __init__(self, expiration_times):
+        """
+        @param expiration_times: dict of endpoint name and seconds a response of the endpoint stays valid
+        """
+        self.__expiration_times = expiration_times
+        # {endpoint: {key: (response, content, timestamp)}}
+        self.__entries = {}
+        # {endpoint: [hits, misses]}
+        self.__statistics = {}
+        # {(endpoint, key): threading.Event} of entries that are currently loaded
+        self.__loading = {}
+        # {endpoint: int} is increased on every invalidation, so outdated loads are not stored
+        self.__generations = {}
+        self.__lock = threading.Lock()
+
+    def is_cached_endpoint(self, endpoint):
+        return endpoint in self.__expiration_times
+
+    def __get_valid_entry(self, endpoint, key):
+        entry = self.__entries.get(endpoint, {}).get(key)
+        if entry is None or time.time() - entry[2] >= self.__expiration_times[endpoint]:
+            return None
+        return entry[0], entry[1]
+
+    def get_or_load(self, endpoint, key, load, is_cacheable):
+        """
+        Returns the cached (response, content) tuple. If there is no valid entry, it is loaded by calling load.
+        Callers that request an entry while it is loaded wait for that load instead of loading it again.
+        @param load: function that returns a (response, content) tuple
+        @param is_cacheable: function that decides if a loaded (response, content) tuple is stored
+        """
+        while True:
+            with self.__lock:
+                statistic = self.__statistics.setdefault(endpoint, [0, 0])
+                entry = self.__get_valid_entry(endpoint, key)
+                if entry is not None:
+                    statistic[0] += 1
+                    return entry
+                loading = self.__loading.get((endpoint, key))
+                if loading is None:
+                    statistic[1] += 1
+                    loading = threading.Event()
+                    self.__loading[(endpoint, key)] = loading
+                    generation = self.__generations.get(endpoint, 0)
+                    break
+            # another caller loads the entry, afterwards it is read from the cache or loaded again if it failed
+            loading.wait()
+
+        try:
+            response, content = load()
+            if is_cacheable(response, content):
+                with self.__lock:
+                    if generation == self.__generations.get(endpoint, 0):
+                        self.__entries.setdefault(endpoint, {})[key] = (response, content, time.time())
+            return response, content
+        finally:
+            with self.__lock:
+                del self.__loading[(endpoint, key)]
+            loading.set()
+
+    def put(self, endpoint, key, response, content):
+        if not self.is_cached_endpoint(endpoint):
+            return
+        with self.__lock:
+            self.__entries.setdefault(endpoint, {})[key] = (response, content, time.time())
+
+    def invalidate(self, endpoint, key=None):
+        """Removes the entry with the key of an endpoint or all entries of the endpoint if no key is given."""
+        with self.__lock:
+            self.__generations[endpoint] = self.__generations.get(endpoint, 0) + 1
+            if key is None:
+                self.__entries.pop(endpoint, None)
+            else:
+                self.__entries.get(endpoint, {}).pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            for endpoint in self.__expiration_times:
+                self.__generations[endpoint] = self.__generations.get(endpoint, 0) + 1
+            self.__entries = {}
+
+    def get_statistics(self):
+        """Returns the hits and misses of every endpoint: {endpoint: {'hits': int, 'misses': int}}"""
+        with self.__lock:
+            return {endpoint: {'hits': hits, 'misses': misses}
+                    for endpoint, (hits, misses) in self.__statistics.items()}
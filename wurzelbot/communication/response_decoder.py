@@ -0,0 +1,176 @@
+"""
+Fast decoder for the responses of the save endpoints (e.g. save/wasser.php). The responses are small JSON-like
+payloads, sometimes with YAML flow syntax. Therefore JSON is tried first and only the YAML flow subset is supported as
+fallback.
+"""
+import json
+
+_WHITESPACE = ' \t\r\n'
+_PLAIN_KEY_END = ':,{}[]'
+_PLAIN_VALUE_END = ',{}[]'
+_CONSTANTS = {'true': True, 'True': True, 'TRUE': True,
+              'false': False, 'False': False, 'FALSE': False,
+              'null': None, 'Null': None, 'NULL': None, '~': None, '': None}
+
+
+class ResponseDecodeError(ValueError):
+    pass
+
+
+def decode_response(content):
+    """
+    Decodes the content of a response.
+    @param content: bytes or str
+    @return: decoded object, usually a dict
+    """
+    try:
+        return json.loads(content)
+    except ValueError:
+        pass
+    if isinstance(content, (bytes, bytearray)):
+        content = content.decode('UTF-8')
+    # like the former preprocessing for PyYAML, tabs and newlines are read as spaces, also in quoted strings
+    content = content.replace('\n', ' ').replace('\t', ' ')
+    try:
+        return json.loads(content, strict=False)
+    except ValueError:
+        pass
+    try:
+        return _FlowParser(content).parse()
+    except ValueError as error:
+        raise ResponseDecodeError(str(error)) from error
+
+
+class _FlowParser:
+    """Parser for YAML flow collections ({key: value} and [item]) with quoted and plain scalars."""
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def parse(self):
+        value = self.parse_value(_PLAIN_VALUE_END)
+        self.skip_whitespace()
+        if self.pos != len(self.text):
+            self.error('unexpected content')
+        return value
+
+    def error(self, message):
+        raise ResponseDecodeError('{} at position {}'.format(message, self.pos))
+
+    def skip_whitespace(self):
+        text = self.text
+        while self.pos < len(text) and text[self.pos] in _WHITESPACE:
+            self.pos += 1
+
+    def peek(self):
+        self.skip_whitespace()
+        if self.pos >= len(self.text):
+            self.error('unexpected end')
+        return self.text[self.pos]
+
+    def parse_value(self, plain_end):
+        char = self.peek()
+        if char == '{':
+            return self.parse_mapping()
+        if char == '[':
+            return self.parse_sequence()
+        if char == '"':
+            return self.parse_double_quoted()
+        if char == "'":
+            return self.parse_single_quoted()
+        return self.parse_plain(plain_end)
+
+    def parse_mapping(self):
+        self.pos += 1
+        mapping = {}
+        while self.peek() != '}':
+            key = self.parse_value(_PLAIN_KEY_END)
+            if self.peek() != ':':
+                self.error('expected ":"')
+            self.pos += 1
+            if self.peek() in ',}':
+                value = None
+            else:
+                value = self.parse_value(_PLAIN_VALUE_END)
+            mapping[key] = value
+            if self.peek() == ',':
+                self.pos += 1
+            elif self.peek() != '}':
+                self.error('expected "," or "}"')
+        self.pos += 1
+        return mapping
+
+    def parse_sequence(self):
+        self.pos += 1
+        sequence = []
+        while self.peek() != ']':
+            sequence.append(self.parse_value(_PLAIN_VALUE_END))
+            if self.peek() == ',':
+                self.pos += 1
+            elif self.peek() != ']':
+                self.error('expected "," or "]"')
+        self.pos += 1
+        return sequence
+
+    def parse_double_quoted(self):
+        end = self.pos + 1
+        text = self.text
+        while True:
+            end = text.find('"', end)
+            if end < 0:
+                self.error('unterminated string')
+            # the quote is escaped if it is preceded by an odd number of backslashes
+            backslashes = 0
+            while text[end - 1 - backslashes] == '\\':
+                backslashes += 1
+            if backslashes % 2 == 0:
+                break
+            end += 1
+        value = json.loads(text[self.pos:end + 1], strict=False)
+        self.pos = end + 1
+        return value
+
+    def parse_single_quoted(self):
+        parts = []
+        start = self.pos + 1
+        text = self.text
+        while True:
+            end = text.find("'", start)
+            if end < 0:
+                self.error('unterminated string')
+            parts.append(text[start:end])
+            # two single quotes are an escaped single quote
+            if text.startswith("''", end):
+                parts.append("'")
+                start = end + 2
+                continue
+            self.pos = end + 1
+            return ''.join(parts)
+
+    def parse_plain(self, plain_end):
+        text = self.text
+        start = self.pos
+        end = start
+        while end < len(text):
+            char = text[end]
+            if char in plain_end:
+                # a colon is only an indicator if it is followed by a space or a flow indicator
+                if char != ':' or end + 1 == len(text) or text[end + 1] in _WHITESPACE + _PLAIN_VALUE_END:
+                    break
+            end += 1
+        self.pos = end
+        return _convert_plain(text[start:end].strip())
+
+
+def _convert_plain(value):
+    if value in _CONSTANTS:
+        return _CONSTANTS[value]
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
@@ -56,6 +56,20 @@ class Session(object):
         sID = str(self.__sessionID)
         self.__logSession.info('Session (ID: {}) geöffnet'.format(sID))
 
+    def restoreSession(self, sessionID, server, serverURL, startTime):
+        """
+        Restores a session that was opened before, e.g. by a previous run of the bot.
+        """
+        self.__sessionID = sessionID
+        self.__server = server
+        self.__serverURL = serverURL
+
+        self.__startTime = startTime
+        self.__endTime = self.__startTime + (self.__lifetime - self.__lifetime_reserve)
+
+        sID = str(self.__sessionID)
+        self.__logSession.info('Session (ID: {}) wiederhergestellt'.format(sID))
+
     def closeSession(self, wunr, server):
         """
         Zurücksetzen aller Informationen. Gleichbedeutend mit einem Schließen der Session.
@@ -69,8 +83,14 @@ class Session(object):
 
     def getRemainingTime(self):
         """Gibt die verbleibende Zeit zurück, bis die Session abläuft."""
+        if self.__endTime is None:
+            return 0
         return self.__endTime - time.time()
 
+    def getStartTime(self):
+        """Returns the time the session was opened."""
+        return self.__startTime
+
     def getSessionID(self):
         """Gibt die Session-ID zurück."""
         return self.__sessionID
@@ -5,6 +5,7 @@ from wurzelbot.communication.http_communication import HTTPConnection
 from wurzelbot.product.storage import Storage
 from wurzelbot.trading.trader import Trader
 from .gardens import GardenManager
+from .placement_planner import PlacementPlanner
 
 
 class Gardener:
@@ -22,28 +23,23 @@ class Gardener:
         if amount < 0 or amount > product_stock:
             amount = product_stock
 
-        planted = 0
+        # placements are planned for all gardens first, so all plants of a garden can be planted with a few requests
+        placements = {}
+        for garden, tiles in PlacementPlanner.plan(GardenManager().gardens, product.size, amount):
+            tile_ids = [tile.tile_id for tile in tiles]
+            placements.setdefault(garden, []).append((tile_ids[0], product.id, tile_ids))
 
-        empty_tiles = GardenManager().get_empty_tiles()
-        updated_empty_tiles = set(empty_tiles)
-
-        for tile in empty_tiles:
-            if tile in updated_empty_tiles and tile.plant_fits(product.size):
-                tiles = []
-                for y in range(product.size[1]):
-                    for x in range(product.size[0]):
-                        tiles.append(tile.garden.garden_field.get_tile(tile.pos_x + x, tile.pos_y + y))
-                tile_ids = [tile.tile_id for tile in tiles]
-                HTTPConnection().grow_plant(tile.tile_id, product.id, tile.garden.garden_id, tile_ids)
-                updated_empty_tiles.difference_update(set(tiles))
-                planted += 1
-                if planted >= amount > 0:
-                    break
+        planted = 0
+        for garden, garden_placements in placements.items():
+            garden_planted = HTTPConnection().grow_plants(garden.garden_id, garden_placements)
+            planted += len(garden_planted)
+            # placements that couldn't be planted show that the garden differs from the server
+            if len(garden_planted) < len(garden_placements) or not garden.apply_planted(product, garden_planted):
+                garden.update_garden()
 
         logging.info("{} has been planted {} times".format(product.name, planted))
 
         Storage().load_storage()
-        GardenManager().update_all()
         Storage().use_product(product)
         return planted
 
@@ -66,7 +62,6 @@ class Gardener:
         if harvested:
             HTTPConnection().cancel_all_contracts()
             Storage().load_storage()
-            GardenManager().update_all()
         else:
             logging.info("nothing to harvest")
 
@@ -85,7 +80,6 @@ class Gardener:
 
         if watered:
             Storage().load_storage()
-            GardenManager().update_all()
         else:
             logging.info("nothing to water")
 
@@ -98,5 +92,6 @@ class Gardener:
 
         HTTPConnection().remove_weed(tile.garden.garden_id, tile.tile_id)
 
-        GardenManager().update_all()
+        if not tile.garden.apply_removed(crop):
+            tile.garden.update_garden()
         AccountData().load_user_data()
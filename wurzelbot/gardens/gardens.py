@@ -3,12 +3,17 @@ import logging
 import time
 
 from wurzelbot.account_data import AccountData
-from wurzelbot.communication.http_communication import HTTPConnection
+from wurzelbot.communication.http_communication import HTTPConnection, HTTPStateError, JSONError
 from wurzelbot.product.product_data import ProductData
 from wurzelbot.utils.singelton_type import SingletonType
 
 GARDEN_WIDTH = 17
 GARDEN_HEIGHT = 12
+# the tiles of a field are bits of an int row by row, every row is followed by a padding bit that is never set.
+# Shifting such a mask moves all positions at once and the padding bit stops plants from wrapping into the next row.
+ROW_STRIDE = GARDEN_WIDTH + 1
+ROW_MASK = (1 << GARDEN_WIDTH) - 1
+ALL_TILES_MASK = sum(ROW_MASK << (y * ROW_STRIDE) for y in range(GARDEN_HEIGHT))
 
 
 class Crop:
@@ -61,6 +66,7 @@ class Tile:
 
     def set_crop(self, crop):
         self.crop = crop
+        self.garden.garden_field.set_tile_free(self, crop is None)
 
     def is_empty(self):
         return self.crop is None
@@ -115,6 +121,8 @@ class Field:
     def __init__(self, garden):
         self.garden_field = []
         self.garden = garden
+        # bit mask of the empty tiles, see ROW_STRIDE
+        self.free_mask = ALL_TILES_MASK
 
         i = 1
         for y in range(GARDEN_HEIGHT):
@@ -147,6 +155,53 @@ class Field:
     def update_tile(self, tile_id, tile_data):
         self.get_tile(tile_id).update(tile_data)
 
+    @staticmethod
+    def get_bit(pos_x, pos_y):
+        return 1 << (pos_y * ROW_STRIDE + pos_x)
+
+    def set_tile_free(self, tile, free):
+        if free:
+            self.free_mask |= Field.get_bit(tile.pos_x, tile.pos_y)
+        else:
+            self.free_mask &= ~Field.get_bit(tile.pos_x, tile.pos_y)
+
+    @staticmethod
+    def get_fit_mask(free_mask, size):
+        """
+        Returns the mask of all tiles where a plant of the size fits in one step for the whole field.
+        A plant fits if all tiles of its size to the right and below are free.
+        """
+        fit_mask = free_mask
+        for x in range(1, size[0]):
+            fit_mask &= free_mask >> x
+        row_fit_mask = fit_mask
+        for y in range(1, size[1]):
+            fit_mask &= row_fit_mask >> (y * ROW_STRIDE)
+        return fit_mask
+
+    @staticmethod
+    def get_size_mask(pos_x, pos_y, size):
+        """Returns the mask of all tiles a plant of the size occupies if it is planted at the position."""
+        row = ((1 << size[0]) - 1) << pos_x
+        return sum(row << ((pos_y + y) * ROW_STRIDE) for y in range(size[1]))
+
+    def get_tile_of_bit(self, bit):
+        """Returns the tile of a mask with one bit set."""
+        pos_y, pos_x = divmod(bit.bit_length() - 1, ROW_STRIDE)
+        return self.garden_field[pos_y][pos_x]
+
+    def get_tiles_of_mask(self, mask):
+        """Returns the tiles of all set bits of a mask ordered like get_tiles_flat."""
+        tiles = []
+        while mask:
+            bit = mask & -mask
+            tiles.append(self.get_tile_of_bit(bit))
+            mask ^= bit
+        return tiles
+
+    def plant_fits(self, size):
+        return Field.get_fit_mask(self.free_mask, size) != 0
+
 
 class Garden:
     _lenX = 17
@@ -156,6 +211,8 @@ class Garden:
     def __init__(self, garden_id):
         self.garden_id = garden_id
         self.garden_field = Field(self)
+        # True if the crops were changed by actions, but some of their times are only estimated
+        self.estimated = False
 
     def get_all_crops(self):
         crops = []
@@ -183,44 +240,103 @@ class Garden:
                          if crop.harvest_time < current_time]))
 
     def get_empty_tiles(self):
-        return [tile for tile in self.garden_field.get_tiles_flat() if tile.is_empty()]
+        return self.garden_field.get_tiles_of_mask(self.garden_field.free_mask)
 
     def has_empty_tiles(self):
-        return len(self.get_empty_tiles()) > 0
+        return self.garden_field.free_mask != 0
 
-    def update_garden(self):
-        garden_data = HTTPConnection().get_garden_data(self.garden_id)
+    def update_garden(self, garden_data=None):
+        if garden_data is None:
+            garden_data = HTTPConnection().get_garden_data(self.garden_id)
         for tile_id, tile_data in garden_data['garden'].items():
             self.garden_field.update_tile(tile_id, tile_data)
+        self.estimated = False
 
-    def plant_fits_at(self, size, pos_x, pos_y):
-        for x in range(size[0]):
-            for y in range(size[1]):
-                cur_x = pos_x + x
-                cur_y = pos_y + y
-                if not self.garden_field.tile_is_valid(cur_x, cur_y) \
-                        or not self.garden_field.get_tile(cur_x, cur_y).is_empty():
-                    return False
+    def apply_planted(self, product, placements):
+        """
+        Applies planted placements to the tiles instead of loading the garden. The harvest times are estimated.
+        @param placements: list of (field, plant, fields) that have been planted
+        @return: False if a tile isn't empty, then the garden differs from the server and has to be loaded
+        """
+        planted_time = int(time.time())
+        for field, plant, fields in placements:
+            tiles = [self.garden_field.get_tile(tile_id) for tile_id in fields]
+            if any(tile is None or not tile.is_empty() for tile in tiles):
+                return False
+            crop = PlantCrop(product, planted_time + product.time_until_harvest, 0, product.size, planted_time, tiles)
+            for tile in tiles:
+                tile.set_crop(crop)
+        self.estimated = True
+        return True
+
+    def apply_watered(self, plants):
+        """
+        Applies watered plants to the tiles instead of loading the garden. Watering may change the harvest times.
+        @param plants: list of (field, fields) that have been watered
+        @return: False if a field has no plant, then the garden differs from the server and has to be loaded
+        """
+        watered_time = int(time.time())
+        for field, fields in plants:
+            crop = self.garden_field.get_tile(field).crop
+            if not isinstance(crop, PlantCrop):
+                return False
+            crop.watered_time = watered_time
+        self.estimated = True
         return True
 
+    def apply_harvested(self):
+        """Removes all plants that are ready to harvest from the tiles instead of loading the garden."""
+        current_time = time.time()
+        for crop in self.get_crops_from_class(PlantCrop):
+            if crop.harvest_time < current_time:
+                for tile in crop.tiles:
+                    tile.set_crop(None)
+
+    def apply_removed(self, crop):
+        """
+        Removes a crop like weed from the tiles instead of loading the garden.
+        @return: False if the crop isn't on its tiles anymore, then the garden has to be loaded
+        """
+        if any(tile.crop is not crop for tile in crop.tiles):
+            return False
+        for tile in crop.tiles:
+            tile.set_crop(None)
+        return True
+
+    @staticmethod
+    def _get_all_field_ids(field_id, sx, sy):
+        """Returns the ids of all fields of a plant with the size sx x sy starting at field_id."""
+        return [field_id + x + y * GARDEN_WIDTH for y in range(sy) for x in range(sx)]
+
+    def plant_fits_at(self, size, pos_x, pos_y):
+        if not self.garden_field.tile_is_valid(pos_x, pos_y):
+            return False
+        return (Field.get_fit_mask(self.garden_field.free_mask, size) & Field.get_bit(pos_x, pos_y)) != 0
+
     def water_plants(self):
         """
         Ein Garten mit der gardenID wird komplett bewässert.
         """
         tiles = self.get_tiles_to_be_watered()
-        for tile in tiles:
-            tile_ids = [tile.tile_id for tile in tile.crop.tiles]
-            HTTPConnection().water_plant_in_garden(self.garden_id, tile.tile_id, tile_ids)
+        plants = [(tile.tile_id, [crop_tile.tile_id for crop_tile in tile.crop.tiles]) for tile in tiles]
+        watered = HTTPConnection().water_plants_in_garden(self.garden_id, plants)
 
-        logging.info('{} plants have been watered in normal garden {}'.format(len(tiles), self.garden_id))
-        self.update_garden()
+        logging.info('{} plants have been watered in normal garden {}'.format(len(watered), self.garden_id))
+        # plants that couldn't be watered show that the garden differs from the server
+        if len(watered) < len(plants) or not self.apply_watered(watered):
+            self.update_garden()
 
     def harvest(self):
         """
         Erntet alles im Garten.
         """
-        HTTPConnection().harvest_garden(self.garden_id)
-        self.update_garden()
+        try:
+            HTTPConnection().harvest_garden(self.garden_id)
+        except (HTTPStateError, JSONError, KeyError, ValueError):
+            logging.debug('harvest response of garden {} is not ok'.format(self.garden_id))
+            self.update_garden()
+            return
+        self.apply_harvested()
 
 
 class AquaGarden(Garden):
@@ -233,13 +349,11 @@ class AquaGarden(Garden):
         Alle Pflanzen im Wassergarten werden bewässert.
         """
         plants = HTTPConnection().get_plants_to_water_in_aqua_garden()
-        nPlants = len(plants['fieldID'])
-        for i in range(0, nPlants):
-            sFields = self._getAllFieldIDsFromFieldIDAndSizeAsString(plants['fieldID'][i], plants['sx'][i],
-                                                                     plants['sy'][i])
-            HTTPConnection().water_plant_in_aqua_garden(plants['fieldID'][i], sFields)
+        all_fields = [self._get_all_field_ids(int(field_id), sx, sy)
+                      for field_id, sx, sy in zip(plants['fieldID'], plants['sx'], plants['sy'])]
+        watered = HTTPConnection().water_plants_in_aqua_garden(all_fields)
 
-        logging.info('Im Wassergarten wurden ' + str(nPlants) + ' Pflanzen gegossen.')
+        logging.info('Im Wassergarten wurden ' + str(len(watered)) + ' Pflanzen gegossen.')
 
     def harvest(self):
         """
@@ -257,12 +371,17 @@ class GardenManager(metaclass=SingletonType):
         """
         Ermittelt die Anzahl der Gärten und initialisiert alle.
         """
+        self.create_gardens()
+        self.update_all()
+
+    def create_gardens(self):
+        """
+        Creates all gardens without loading their data.
+        """
         self.gardens = []
         tmp_number_of_gardens = AccountData().number_of_gardens
         for i in range(1, tmp_number_of_gardens + 1):
-            garden = Garden(i)
-            self.gardens.append(garden)
-            garden.update_garden()
+            self.gardens.append(Garden(i))
 
         if AccountData().aqua_garden_available is True:
             self.aqua_garden = AquaGarden()
@@ -290,15 +409,10 @@ class GardenManager(metaclass=SingletonType):
         return [tile for garden in self.gardens for tile in garden.get_empty_tiles()]
 
     def has_empty_tiles(self):
-        return len(self.get_empty_tiles()) > 0
+        return any(garden.has_empty_tiles() for garden in self.gardens)
 
     def can_be_planted_now(self, product):
-        for garden in self.gardens:
-            for x in range(GARDEN_WIDTH):
-                for y in range(GARDEN_HEIGHT):
-                    if garden.plant_fits_at(product.size, x, y):
-                        return True
-        return False
+        return any(garden.garden_field.plant_fits(product.size) for garden in self.gardens)
 
     def get_num_of_plantable_tiles(self):
         num_of_tiles = 0
@@ -312,5 +426,16 @@ class GardenManager(metaclass=SingletonType):
         return [crop for garden in self.gardens for crop in garden.get_crops_from_class(crop_class)]
 
     def update_all(self):
-        for garden in self.gardens:
-            garden.update_garden()
+        self.update_gardens(self.gardens)
+
+    def update_estimated(self):
+        """Loads all gardens whose crops were changed by actions, so that their times are exact again."""
+        self.update_gardens([garden for garden in self.gardens if garden.estimated])
+
+    @staticmethod
+    def update_gardens(gardens):
+        # gardens are independent of each other, so they can be loaded concurrently
+        all_garden_data = HTTPConnection().gather(
+            *[HTTPConnection().get_garden_data_async(garden.garden_id) for garden in gardens])
+        for garden, garden_data in zip(gardens, all_garden_data):
+            garden.update_garden(garden_data)
@@ -0,0 +1,170 @@
+"""
+Planning of the placements of one product in all gardens, so that as many plants as possible fit into the empty tiles.
+The empty tiles of a field are split into connected regions, which are packed independently. Plants in one row or
+column are packed optimally by a scan in rows. Otherwise a region is packed by the best of several greedy scans. Only
+if the packing stays below an upper bound of the region, further scans and for small regions an exact search run.
+In benchmarks/bench_placement_planner.py with 20 seeds, the further scans add 1.6%, 2.5% and 0.4% more 2x2 plants to
+gardens occupied by 10%, 30% and 50%. The exact search adds no plants there and no measurable time.
+"""
+from .gardens import GARDEN_HEIGHT, GARDEN_WIDTH, ROW_STRIDE, Field
+
+EXACT_MAX_TILES = 40  # regions up to this number of tiles are packed exactly
+EXACT_MAX_STEPS = 20000  # the exact search stops after this many steps and keeps the best packing found so far
+
+_COLUMN_MASKS = [sum(Field.get_bit(x, y) for y in range(GARDEN_HEIGHT)) for x in range(GARDEN_WIDTH)]
+
+
+def _count_tiles(mask):
+    return bin(mask).count('1')
+
+
+def _split_into_regions(free_mask):
+    """Splits a mask of free tiles into masks of connected tiles."""
+    regions = []
+    while free_mask:
+        region = free_mask & -free_mask
+        while True:
+            # the padding bits are never free, so tiles don't connect across rows
+            grown = region | ((region << 1) | (region >> 1) | (region << ROW_STRIDE) | (region >> ROW_STRIDE)) \
+                & free_mask
+            if grown == region:
+                break
+            region = grown
+        regions.append(region)
+        free_mask &= ~region
+    return regions
+
+
+def _get_cover_mask(fit_mask, size):
+    """Returns the mask of all tiles that are covered by a plant at one of the positions where it fits."""
+    cover_mask = fit_mask
+    for x in range(1, size[0]):
+        cover_mask |= fit_mask << x
+    row_cover_mask = cover_mask
+    for y in range(1, size[1]):
+        cover_mask |= row_cover_mask << (y * ROW_STRIDE)
+    return cover_mask
+
+
+def _get_upper_bound(fit_mask, size):
+    """Returns the maximal number of plants, free tiles that no plant fits on can't be used."""
+    return _count_tiles(_get_cover_mask(fit_mask, size)) // (size[0] * size[1])
+
+
+def _get_position(bit):
+    pos_y, pos_x = divmod(bit.bit_length() - 1, ROW_STRIDE)
+    return pos_x, pos_y
+
+
+def _lowest_in_rows(fit_mask):
+    return fit_mask & -fit_mask
+
+
+def _highest_in_rows(fit_mask):
+    return 1 << (fit_mask.bit_length() - 1)
+
+
+def _lowest_in_columns(fit_mask):
+    for column_mask in _COLUMN_MASKS:
+        if fit_mask & column_mask:
+            return _lowest_in_rows(fit_mask & column_mask)
+
+
+def _highest_in_columns(fit_mask):
+    for column_mask in reversed(_COLUMN_MASKS):
+        if fit_mask & column_mask:
+            return _highest_in_rows(fit_mask & column_mask)
+
+
+# the scan in rows from the top left is the former placement and therefore the first candidate
+_SCANS = [_lowest_in_rows, _highest_in_rows, _lowest_in_columns, _highest_in_columns]
+
+
+def _pack_greedy(free_mask, size, scan):
+    """Places plants one after another at the first position of the scan where they fit."""
+    anchors = []
+    fit_mask = Field.get_fit_mask(free_mask, size)
+    while fit_mask:
+        anchor = scan(fit_mask)
+        anchors.append(anchor)
+        free_mask &= ~Field.get_size_mask(*_get_position(anchor), size)
+        fit_mask = Field.get_fit_mask(free_mask, size)
+    return anchors
+
+
+def _pack_exact(free_mask, size, anchors):
+    """
+    Searches a packing with more plants than the given one. The first free tile is either left empty or covered by a
+    plant, which then has to start at this tile. Branches that can't beat the best packing by the upper bound of their
+    free tiles are skipped.
+    """
+    best = [list(anchors)]
+    steps = [0]
+
+    def search(free_mask, placed):
+        steps[0] += 1
+        fit_mask = Field.get_fit_mask(free_mask, size)
+        if len(placed) + _get_upper_bound(fit_mask, size) <= len(best[0]) or steps[0] > EXACT_MAX_STEPS:
+            return
+        if len(placed) > len(best[0]):
+            best[0] = list(placed)
+        if not fit_mask:
+            return
+        first = _lowest_in_rows(free_mask)
+        if fit_mask & first:
+            placed.append(first)
+            search(free_mask & ~Field.get_size_mask(*_get_position(first), size), placed)
+            placed.pop()
+        search(free_mask & ~first, placed)
+
+    search(free_mask, [])
+    return best[0]
+
+
+def _pack_region(region, size):
+    # further scans and the exact search only run as long as the packing might not be the best one
+    upper_bound = _get_upper_bound(Field.get_fit_mask(region, size), size)
+    anchors = _pack_greedy(region, size, _SCANS[0])
+    for scan in _SCANS[1:]:
+        if len(anchors) >= upper_bound:
+            return anchors
+        packing = _pack_greedy(region, size, scan)
+        # the former placement is kept unless another scan is better
+        if len(packing) > len(anchors):
+            anchors = packing
+    if len(anchors) < upper_bound and _count_tiles(region) <= EXACT_MAX_TILES:
+        anchors = _pack_exact(region, size, anchors)
+    return anchors
+
+
+class PlacementPlanner:
+    @staticmethod
+    def plan_field(field, size):
+        """Returns the anchor tiles of a packing of plants with the size into the empty tiles of the field."""
+        # plants in one row or column only compete with plants in the same line, where the scan is optimal
+        if size[0] == 1 or size[1] == 1:
+            anchors = _pack_greedy(field.free_mask, size, _lowest_in_rows)
+            return [field.get_tile_of_bit(anchor) for anchor in anchors]
+        anchors = 0
+        for region in _split_into_regions(field.free_mask):
+            for anchor in _pack_region(region, size):
+                anchors |= anchor
+        return field.get_tiles_of_mask(anchors)
+
+    @staticmethod
+    def plan(gardens, size, amount=-1):
+        """
+        Plans the placements of a product in all gardens in one go.
+        @param size: (sx, sy) of the product
+        @param amount: maximal number of placements, all placements if it isn't positive
+        @return: list of (garden, tiles) ordered by garden and position, the first tile is the one to plant on
+        """
+        placements = []
+        for garden in gardens:
+            field = garden.garden_field
+            for tile in PlacementPlanner.plan_field(field, size):
+                if 0 < amount <= len(placements):
+                    return placements
+                size_mask = Field.get_size_mask(tile.pos_x, tile.pos_y, size)
+                placements.append((garden, field.get_tiles_of_mask(size_mask)))
+        return placements
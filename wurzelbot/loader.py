@@ -0,0 +1,88 @@
+import datetime
+import logging
+import time
+
+from wurzelbot.account_data import AccountData
+from wurzelbot.gardens.gardens import GardenManager
+from wurzelbot.product.product_data import ProductData
+from wurzelbot.product.storage import Storage
+from wurzelbot.trading.market import Market
+
+DAY = datetime.timedelta(days=1).total_seconds()
+
+# data sources in the order they are loaded: (name, seconds the data stays valid, reload after a level-up)
+# sources with a validity of 0 are loaded on every wake-up
+DATA_SOURCES = [
+    ('user data', 0, False),
+    ('stats', DAY, True),
+    ('garden availability', DAY, True),
+    ('products', DAY, True),
+    ('gardens', 0, False),
+    ('shelves', DAY, False),
+    ('storage', 0, False),
+]
+
+
+class DataLoader:
+    """
+    Loads the data of the bot. Every data source knows how volatile its data is, so after a sleep only the stale data
+    is loaded again instead of everything.
+    """
+
+    def __init__(self, catalog_file=None):
+        self.catalog_file = catalog_file
+        # {name: time of the last load}
+        self.__load_times = {}
+        self.__loaders = {
+            'user data': self.__load_user_data,
+            'stats': AccountData().load_stats,
+            'garden availability': AccountData().load_garden_availability,
+            'products': self.__load_products,
+            'gardens': self.__load_gardens,
+            'shelves': lambda: Storage().load_storage(efficient_load=False),
+            'storage': self.__load_storage,
+        }
+        self.__level_up = False
+
+    def is_stale(self, name, max_age, reload_on_level_up):
+        load_time = self.__load_times.get(name)
+        return load_time is None or time.time() - load_time >= max_age or (reload_on_level_up and self.__level_up)
+
+    def load(self):
+        """Loads all stale data sources."""
+        self.__level_up = False
+        skipped = []
+        for name, max_age, reload_on_level_up in DATA_SOURCES:
+            if not self.is_stale(name, max_age, reload_on_level_up):
+                skipped.append(name)
+                continue
+            self.__loaders[name]()
+            self.__load_times[name] = time.time()
+        if len(skipped) > 0:
+            logging.debug('skipped loading of {}, because it is up to date'.format(', '.join(skipped)))
+
+    def __load_user_data(self):
+        old_level = AccountData().level
+        AccountData().load_user_data()
+        self.__level_up = old_level is not None and old_level < AccountData().level
+        # in case of level up, recalculate the most profitable product
+        if self.__level_up:
+            Market().dispose_profitability()
+
+    def __load_products(self):
+        # the catalog is only loaded once, afterwards only the tradable products are refreshed
+        ProductData().init_products(self.catalog_file, refresh_tradable=self.__level_up)
+
+    @staticmethod
+    def __load_gardens():
+        # every garden is visited once: loading the wimps changes to each garden and the responses of these
+        # garden changes are reused as garden data
+        GardenManager().create_gardens()
+        Market().load_wimp_data()
+        GardenManager().update_all()
+
+    def __load_storage(self):
+        # the shelves were loaded completely just before, otherwise only the stock is updated
+        if self.__load_times.get('shelves', 0) >= self.__load_times.get('storage', 0):
+            return
+        Storage().load_storage()
@@ -11,7 +11,7 @@ import sys
 from wurzelbot.WurzelBot import WurzelBot
 
 
-def initWurzelBot(user_name, password, server):
+def initWurzelBot(user_name, password, server, session_file=None, catalog_file=None, base_url=None, record_file=None):
     logging_level_env_var = os.environ.get('WURZELBOT_LOGGING_LEVEL')
     if str(logging_level_env_var).lower() == "debug":
         logging_level = logging.DEBUG
@@ -27,7 +27,7 @@ def initWurzelBot(user_name, password, server):
     logging.basicConfig(stream=sys.stdout, level=logging_level, format=logging_format, datefmt='%Y-%m-%d %H:%M:%S')
     logging.info('-------------------------------------------')
     logging.info('booting wurzelbot')
-    wurzel_bot = WurzelBot(user_name, password, server)
+    wurzel_bot = WurzelBot(user_name, password, server, session_file, catalog_file, base_url, record_file)
 
     signal.signal(signal.SIGINT, wurzel_bot.send_termination)
     signal.signal(signal.SIGTERM, wurzel_bot.send_termination)
@@ -43,8 +43,17 @@ def main():
         logging.error("Environment variables WURZELBOT_USER, WURZELBOT_PW or WURZELBOT_SERVER are missing.")
         return
 
+    # optional file to keep the session beyond restarts
+    session_file = os.environ.get('WURZELBOT_SESSION_FILE')
+    # optional file to keep the product catalog beyond restarts
+    catalog_file = os.environ.get('WURZELBOT_CATALOG_FILE')
+    # optional url of a stand-in game server (python -m wurzelbot.simulation) instead of the game servers
+    base_url = os.environ.get('WURZELBOT_BASE_URL')
+    # optional file to record all requests and responses, which can be replayed by the stand-in game server
+    record_file = os.environ.get('WURZELBOT_RECORD_FILE')
+
     # Login und Initialisierung des Bots
-    wurzel_bot = initWurzelBot(user, pw, int(server))
+    wurzel_bot = initWurzelBot(user, pw, int(server), session_file, catalog_file, base_url, record_file)
     wurzel_bot.init_bot()
 
     # automatisches pflanzen starten
@@ -4,13 +4,24 @@ Created on 23.05.2019
 @author: MrFlamez
 """
 
+import datetime
+import hashlib
 import json
+import logging
+import time
 from enum import Enum
 
 from wurzelbot.communication.http_communication import HTTPConnection
 from wurzelbot.trading.shop import Shop
 from wurzelbot.utils.singelton_type import SingletonType
 
+# TODO: add flower shop, but it's more complicated because it's only open at wed and sat
+SHOPS = [Shop.TREE, Shop.FARM, Shop.DECORATION]
+# the format of the catalog file, a catalog file with another version is ignored
+CATALOG_VERSION = 1
+# the tradable products change with the level, they are reloaded at least once a day to notice other changes
+TRADABLE_PRODUCTS_MAX_AGE = datetime.timedelta(days=1).total_seconds()
+
 
 class ProductType(Enum):
     DECORATION = 'd'
@@ -32,7 +43,7 @@ class Product:
             product_type = 'c'
         self.product_type = ProductType(product_type)
         self.size = (sx, sy)
-        self.name = name.decode('UTF-8')
+        self.name = name
         self.level = lvl
         self.harvest_quantity = crop
         self.is_plantable = plantable
@@ -67,12 +78,16 @@ class ProductData(metaclass=SingletonType):
 
     def __init__(self):
         self.__products = []
+        # (server, sha1 of the product data) the products were loaded for
+        self.__catalog_key = None
+        self.__tradable_products_time = 0
 
-    def load_prices(self):
+    def load_prices(self, npc_prices=None):
         """
         Ermittelt alle möglichen NPC Preise und setzt diese in den Produkten.
         """
-        npc_prices = HTTPConnection().get_npc_prices()
+        if npc_prices is None:
+            npc_prices = HTTPConnection().get_npc_prices()
         for product in self.__products:
             if product.name in npc_prices.keys():
                 product.price_npc = npc_prices[product.name]
@@ -81,16 +96,25 @@ class ProductData(metaclass=SingletonType):
         coins = self.get_product_by_name('Coins')
         coins.price_npc = float(300)
 
-    def load_tradable_products(self):
-        for product_id in HTTPConnection().get_all_tradeable_products_from_overview():
+    def load_tradable_products(self, tradable_product_ids=None):
+        if tradable_product_ids is None:
+            tradable_product_ids = HTTPConnection().get_all_tradeable_products_from_overview()
+        for product in self.__products:
+            product.is_tradable = False
+        for product_id in tradable_product_ids:
             self.get_product_by_id(product_id).is_tradable = True
+        self.__tradable_products_time = time.time()
 
-    def load_shops(self):
-        # TODO: add flower shop, but it's more complicated because it's only open at wed and sat
-        shops = [Shop.TREE, Shop.FARM, Shop.DECORATION]
+    def load_shops(self, shop_product_ids=None):
+        """
+        Sets the shop for every product that can be bought in a shop.
+        @param shop_product_ids: already loaded product ids of each shop in SHOPS
+        """
+        if shop_product_ids is None:
+            shop_product_ids = HTTPConnection().gather(
+                *[HTTPConnection().get_product_ids_from_shop_async(shop.value) for shop in SHOPS])
 
-        for shop in shops:
-            product_ids = HTTPConnection().get_product_ids_from_shop(shop.value)
+        for shop, product_ids in zip(SHOPS, shop_product_ids):
             for product_id in product_ids:
                 self.get_product_by_id(product_id).buy_in_shop = shop
 
@@ -116,31 +140,115 @@ class ProductData(metaclass=SingletonType):
     def get_list_of_all_product_ids(self):
         return [product.id for product in self.__products]
 
-    def init_products(self):
+    def init_products(self, catalog_file=None, refresh_tradable=False):
         """
-        Initialisiert alle Produkte.
+        Initialisiert alle Produkte. Die Produkte werden nur beim ersten Aufruf geladen, danach werden nur die
+        handelbaren Produkte neu geladen, wenn refresh_tradable gesetzt ist oder sie veraltet sind.
+        @param catalog_file: optional file to keep the catalog beyond restarts. It is reused as long as the product
+        data of the server doesn't change.
+        @param refresh_tradable: True after a level-up, because products were unlocked
         """
-        products = dict(json.loads(HTTPConnection().get_all_product_informations()))
+        if len(self.__products) == 0:
+            products = HTTPConnection().get_all_product_informations()
+            catalog_key = (HTTPConnection().get_server(), hashlib.sha1(products).hexdigest())
+            if catalog_file is None or not self.__load_catalog(catalog_file, catalog_key):
+                self.__load_products(products)
+                self.__catalog_key = catalog_key
+                self.__save_catalog(catalog_file)
+                return
+        if refresh_tradable or time.time() - self.__tradable_products_time >= TRADABLE_PRODUCTS_MAX_AGE:
+            self.load_tradable_products()
+            self.__save_catalog(catalog_file)
+
+    def __load_products(self, products):
+        """Erstellt alle Produkte aus den Produktinformationen und lädt deren Preise, Handelbarkeit und Shops."""
+        products = json.loads(products)
         # Nicht genutzte Attribute: img, imgPhase, fileext, clear, edge, pieces, speedup_cooldown in Kategorie z
         for key in sorted(products.keys()):
             # 999 ist nur ein Testeintrag und wird nicht benötigt.
             if key == '999':
                 continue
 
-            name = products[key]['name'].replace('&nbsp;', ' ')
+            data = products[key]
             self.__products.append(Product(id=int(key),
-                                           product_type=products[key]['category'],
-                                           sx=products[key]['sx'],
-                                           sy=products[key]['sy'],
-                                           name=name.encode('utf-8'),
-                                           lvl=products[key]['level'],
-                                           crop=products[key]['crop'],
-                                           plantable=products[key]['plantable'],
-                                           time=products[key]['time']))
-
-        self.load_prices()
-        self.load_tradable_products()
-        self.load_shops()
+                                           product_type=data['category'],
+                                           sx=data['sx'],
+                                           sy=data['sy'],
+                                           name=data['name'].replace('&nbsp;', ' '),
+                                           lvl=data['level'],
+                                           crop=data['crop'],
+                                           plantable=data['plantable'],
+                                           time=data['time']))
+
+        # prices, tradable products and shops are independent of each other and are loaded concurrently
+        npc_prices, tradable_product_ids, *shop_product_ids = HTTPConnection().gather(
+            HTTPConnection().get_npc_prices_async(),
+            HTTPConnection().get_all_tradeable_products_from_overview_async(),
+            *[HTTPConnection().get_product_ids_from_shop_async(shop.value) for shop in SHOPS])
+        self.load_prices(npc_prices)
+        self.load_tradable_products(tradable_product_ids)
+        self.load_shops(shop_product_ids)
+
+    def __load_catalog(self, catalog_file, catalog_key):
+        """
+        Loads the products from a catalog file that was saved for the same server and product data.
+        @return: False if the catalog file doesn't exist or doesn't match
+        """
+        try:
+            with open(catalog_file) as file:
+                catalog = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if catalog.get('version') != CATALOG_VERSION \
+                or (catalog.get('server'), catalog.get('products_hash')) != catalog_key:
+            logging.debug('product catalog is outdated')
+            return False
+
+        for data in catalog['products']:
+            product = Product(id=data['id'],
+                              product_type=data['product_type'],
+                              sx=data['sx'],
+                              sy=data['sy'],
+                              name=data['name'],
+                              lvl=data['level'],
+                              crop=data['crop'],
+                              plantable=data['plantable'],
+                              time=data['time'])
+            product.price_npc = data['price_npc']
+            product.is_tradable = data['is_tradable']
+            if data['buy_in_shop'] is not None:
+                product.buy_in_shop = Shop(data['buy_in_shop'])
+            self.__products.append(product)
+        self.__catalog_key = catalog_key
+        self.__tradable_products_time = catalog['tradable_products_time']
+        logging.debug('loaded product catalog')
+        return True
+
+    def __save_catalog(self, catalog_file):
+        if catalog_file is None:
+            return
+        server, products_hash = self.__catalog_key
+        catalog = {
+            'version': CATALOG_VERSION,
+            'server': server,
+            'products_hash': products_hash,
+            'tradable_products_time': self.__tradable_products_time,
+            'products': [{'id': product.id,
+                          'product_type': product.product_type.value,
+                          'sx': product.size[0],
+                          'sy': product.size[1],
+                          'name': product.name,
+                          'level': product.level,
+                          'crop': product.harvest_quantity,
+                          'plantable': product.is_plantable,
+                          'time': product.time_until_harvest,
+                          'price_npc': product.price_npc,
+                          'is_tradable': product.is_tradable,
+                          'buy_in_shop': product.buy_in_shop.value if product.buy_in_shop is not None else None}
+                         for product in self.__products],
+        }
+        with open(catalog_file, 'w') as file:
+            json.dump(catalog, file)
 
     def print_all(self):
         for product in sorted(self.__products, key=lambda x: x.name.lower()):
@@ -1,3 +1,4 @@
+from wurzelbot.gardens.garden_helper import GardenHelper
 from wurzelbot.gardens.gardens import GardenManager
 
 
@@ -10,7 +11,6 @@ class ProductHelper:
 
     @staticmethod
     def potential_quantity(product):
-        from wurzelbot.gardens.garden_helper import GardenHelper
         return GardenHelper.get_potential_quantity_of(product)
 
     @staticmethod
@@ -89,11 +89,14 @@ class Shelf:
                 return box
         return None
 
+    def load_pages(self, data):
+        self.num_pages = int(data['regalzahl'])
+        self.max_pages = int(data['maxRegale'])
+
     def load_shelf(self, data=None):
         if data is None:
             data = HTTPConnection().get_inventory(self.shelf_type.value)
-            self.num_pages = int(data['regalzahl'])
-            self.max_pages = int(data['maxRegale'])
+            self.load_pages(data)
 
         self.product_ids = data['sort'][self.shelf_type.value]
         inventory = data['produkte']
@@ -132,14 +135,18 @@ class Storage(metaclass=SingletonType):
         """
         Führt ein Update des Lagerbestands für alle Produkte durch.
         """
-        inventory = None
-        for shelf in self.shelves:
-            if efficient_load:
-                if inventory is None:
-                    inventory = HTTPConnection().get_inventory(ShelfType.NORMAL.value)
+        if efficient_load:
+            inventory = HTTPConnection().get_inventory(ShelfType.NORMAL.value)
+            for shelf in self.shelves:
                 shelf.load_shelf(inventory)
-            else:
-                shelf.load_shelf()
+            return
+
+        # every shelf has its own inventory request, which are independent of each other
+        inventories = HTTPConnection().gather(
+            *[HTTPConnection().get_inventory_async(shelf.shelf_type.value) for shelf in self.shelves])
+        for shelf, inventory in zip(self.shelves, inventories):
+            shelf.load_pages(inventory)
+            shelf.load_shelf(inventory)
 
     def get_shelf(self, shelf_type):
         for shelf in self.shelves:
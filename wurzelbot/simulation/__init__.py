@@ -0,0 +1,4 @@
+"""
+Stand-in game server, which replays recorded responses and simulates the state of the core endpoints, so the bot can
+run offline for tests and benchmarks. Start it with python -m wurzelbot.simulation.
+"""
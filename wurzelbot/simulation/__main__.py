@@ -0,0 +1,3 @@
+from wurzelbot.simulation.server import main
+
+main()
@@ -0,0 +1,370 @@
+"""
+Simulated state of a player for the core endpoints of the stand-in game server. The state starts with the first
+recorded responses of these endpoints and is changed by the requests like on the game server, so the bot sees the
+effects of its own actions. Only the effects the bot relies on are simulated, e.g. watering doesn't speed up growth.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import namedtuple
+from html import escape
+
+from wurzelbot.communication import extraction
+from wurzelbot.gardens.gardens import GARDEN_HEIGHT, GARDEN_WIDTH
+from wurzelbot.product.product_data import ProductType
+from wurzelbot.product.storage import PRODUCTTYPE_TO_SHELFTYPE, ShelfType
+
+Response = namedtuple('Response', 'status headers content')
+
+MARKET_PAGE_SIZE = 10  # offers per page of the marketplace
+
+# indices of the list that describes a tile in the garden data
+TILE_PRODUCT = 0
+TILE_X = 1  # position of the tile in its crop, starting at 1
+TILE_Y = 2
+TILE_HARVEST_TIME = 3
+TILE_WATERED_TIME = 4
+TILE_SIZE = 9
+TILE_PLANTED_TIME = 10
+EMPTY_TILE = [0, 1, 1, 0, 0, 0, 0, 0, 0, '1x1', 0]
+
+# used if the recording doesn't contain the response of an endpoint
+DEFAULT_USER_DATA = {
+    'success': 1,
+    'uname': 'wurzelbot',
+    'bar_unformat': 1000.0,
+    'points': 0,
+    'coins': 0,
+    'levelnr': 1,
+    'level': 'Gurkensucher',
+    'time': 0,
+    'dailyloginbonus': {'data': {'rewards': {}}},
+}
+DEFAULT_GARDEN_DATA = {'status': 'ok'}
+DEFAULT_INVENTORY_DATA = {
+    'status': 'ok',
+    'sort': {shelf_type.value: [] for shelf_type in ShelfType},
+    'regalzahl': 1,
+    'maxRegale': 1,
+}
+
+
+def json_response(data, status=200):
+    return Response(status, {'Content-Type': 'application/json'}, json.dumps(data).encode('UTF-8'))
+
+
+def html_response(text, status=200):
+    return Response(status, {'Content-Type': 'text/html; charset=UTF-8'}, text.encode('UTF-8'))
+
+
+def _get_parameter(parameters, name, default=None):
+    for key, value in parameters:
+        if key == name:
+            return value
+    return default
+
+
+def _get_parameters(parameters, name):
+    return [value for key, value in parameters if key == name]
+
+
+def _format_number(value, decimals):
+    """Formats a number like the game, e.g. 1.234,50"""
+    return '{:,.{}f}'.format(value, decimals).replace(',', ' ').replace('.', ',').replace(' ', '.')
+
+
+class GameState:
+    """
+    State of the player on the stand-in game server. All requests are handled under one lock, so concurrent requests
+    are applied one after another.
+    """
+
+    def __init__(self, base_url, exchanges=()):
+        """
+        @param base_url: url of the stand-in game server, which is used in redirects
+        @param exchanges: recorded exchanges, the first responses of the core endpoints are the initial state
+        """
+        self.base_url = base_url
+        self.__lock = threading.Lock()
+        self.user_data = dict(DEFAULT_USER_DATA)
+        # {product_id: data of data_products}
+        self.products = {}
+        # {garden_id: {tile_id: tile}}, the other data of a garden response is kept in garden_data
+        self.gardens = {}
+        self.garden_data = {}
+        self.active_garden = 1
+        # {product_id: quantity} with product ids as str like in the responses
+        self.inventory = {}
+        self.inventory_data = {}
+        # {product_id: [Offer]} ordered by price
+        self.offers = {}
+        # the user id is sent as cookie, it is known from the statistics requests of a recording
+        self.user_id = 1
+        self.session_id = None
+        self.token = None
+        self.__load(exchanges)
+
+    def __load(self, exchanges):
+        user_data_loaded = False
+        inventory_loaded = False
+        market_pages = set()
+        for exchange in exchanges:
+            if exchange['status'] != 200:
+                continue
+            endpoint = exchange['endpoint']
+            parameters = exchange['parameters']
+            content = exchange['content']
+            if endpoint == 'statsGetStats' and _get_parameter(parameters, 'which') == '0':
+                self.user_id = int(_get_parameter(parameters, 'additional'))
+            elif endpoint == 'menu-update.php' and not user_data_loaded:
+                self.user_data = json.loads(content)
+                user_data_loaded = True
+            elif endpoint == 'main.php' and _get_parameter(parameters, 'page') == 'garden' and not self.products:
+                products = extraction.get_data_products(content)
+                if products is not None:
+                    self.products = {int(key): data for key, data in json.loads(products).items()}
+            elif endpoint == 'changeGarden':
+                garden_id = int(_get_parameter(parameters, 'garden'))
+                if garden_id not in self.gardens:
+                    self.garden_data[garden_id] = json.loads(content)
+                    self.gardens[garden_id] = self.garden_data[garden_id].pop('garden')
+            elif endpoint == 'updatelager.php':
+                shelf_type = _get_parameter(parameters, 'type')
+                if shelf_type not in self.inventory_data:
+                    self.inventory_data[shelf_type] = json.loads(content)
+                    inventory = self.inventory_data[shelf_type].pop('produkte')
+                    # every shelf type contains the whole inventory
+                    if not inventory_loaded:
+                        self.inventory = inventory
+                        inventory_loaded = True
+            elif endpoint == 'markt.php' and exchange['method'] == 'GET' and _get_parameter(parameters, 'v'):
+                product_id = int(_get_parameter(parameters, 'v'))
+                page = int(_get_parameter(parameters, 'page', 1))
+                if (product_id, page) not in market_pages:
+                    offers, _ = extraction.get_offers_from_market_page(content, page)
+                    self.offers.setdefault(product_id, []).extend(offers)
+                    market_pages.add((product_id, page))
+        for offers in self.offers.values():
+            offers.sort(key=lambda offer: offer.price)
+
+    def handle(self, endpoint, method, parameters):
+        """
+        Handles a request of a core endpoint.
+        @param parameters: list of (name, value) of the query and the body
+        @return: Response or None if the request isn't simulated and has to be replayed
+        """
+        handler = self.__get_handler(endpoint, method, parameters)
+        if handler is None:
+            return None
+        with self.__lock:
+            return handler(parameters)
+
+    def __get_handler(self, endpoint, method, parameters):
+        if endpoint == 'main.php' and _get_parameter(parameters, 'page') == 'logout':
+            return self.__log_out
+        if endpoint == 'markt.php':
+            if method == 'POST' and _get_parameter(parameters, 'buy_id') is not None:
+                return self.__buy
+            if method == 'GET' and _get_parameter(parameters, 'v') is not None:
+                return self.__get_market_page
+            return None
+        return {
+            '': self.__get_server_status,
+            'dispatch.php': self.__log_in,
+            'logw.php': self.__open_session,
+            'menu-update.php': self.__get_user_data,
+            'changeGarden': self.__change_garden,
+            'gardenHarvestAll': self.__harvest,
+            'pflanz.php': self.__plant,
+            'wasser.php': self.__water,
+            'updatelager.php': self.__get_inventory,
+        }.get(endpoint)
+
+    # login
+    def __get_server_status(self, parameters):
+        return html_response('<html><body></body></html>')
+
+    def __log_in(self, parameters):
+        self.token = uuid.uuid4().hex
+        url = '{}logw.php?port=1&unr=000000&portunr=0000000&token={}'.format(self.base_url, self.token)
+        return json_response({'status': 'ok', 'url': url})
+
+    def __open_session(self, parameters):
+        self.session_id = uuid.uuid4().hex
+        # the cookies are sent as two headers, which httplib2 joins like the game server's
+        headers = {'Location': self.base_url + 'main.php?page=garden',
+                   'Set-Cookie': ['PHPSESSID={}; path=/'.format(self.session_id),
+                                  'wunr={}; path=/'.format(self.user_id)]}
+        return Response(302, headers, b'')
+
+    def __log_out(self, parameters):
+        self.session_id = None
+        return Response(302, {'Location': self.base_url, 'Set-Cookie': ['PHPSESSID=deleted; path=/']}, b'')
+
+    def __get_user_data(self, parameters):
+        self.user_data['time'] = int(time.time())
+        return json_response(self.user_data)
+
+    # gardens
+    def __get_garden(self, garden_id):
+        if garden_id not in self.gardens:
+            self.garden_data[garden_id] = dict(DEFAULT_GARDEN_DATA)
+            self.gardens[garden_id] = {}
+        garden = self.gardens[garden_id]
+        # responses contain every tile, so emptied tiles are updated by the bot
+        for tile_id in range(1, GARDEN_WIDTH * GARDEN_HEIGHT + 1):
+            garden.setdefault(str(tile_id), list(EMPTY_TILE))
+        return garden
+
+    def __change_garden(self, parameters):
+        self.active_garden = int(_get_parameter(parameters, 'garden'))
+        garden = self.__get_garden(self.active_garden)
+        return json_response({**self.garden_data[self.active_garden], 'garden': garden})
+
+    def __get_garden_of_request(self, parameters):
+        # requests with a garden parameter change the active garden
+        if _get_parameter(parameters, 'garden') is not None:
+            self.active_garden = int(_get_parameter(parameters, 'garden'))
+        return self.__get_garden(self.active_garden)
+
+    def __harvest(self, parameters):
+        garden = self.__get_garden(self.active_garden)
+        now = time.time()
+        for tile_id, tile in garden.items():
+            product = self.products.get(int(tile[TILE_PRODUCT]))
+            if product is None or product['category'] != ProductType.VEGETABLES.value \
+                    or int(tile[TILE_HARVEST_TIME]) > now:
+                continue
+            # the crop is added once for the first tile of a plant
+            if (int(tile[TILE_X]), int(tile[TILE_Y])) == (1, 1):
+                self.__add_to_inventory(int(tile[TILE_PRODUCT]), int(product['crop']))
+            garden[tile_id] = list(EMPTY_TILE)
+        return json_response({'status': 'ok'})
+
+    def __plant(self, parameters):
+        garden = self.__get_garden_of_request(parameters)
+        now = int(time.time())
+        grown = []
+        for plant, field, fields in zip(_get_parameters(parameters, 'pflanze[]'), _get_parameters(parameters, 'feld[]'),
+                                        _get_parameters(parameters, 'felder[]')):
+            product_id = int(plant)
+            product = self.products.get(product_id)
+            if product is None or int(self.inventory.get(str(product_id), 0)) <= 0:
+                continue
+            tiles = self.__get_tiles(int(field), int(product['sx']), int(product['sy']))
+            if sorted(tiles.keys()) != sorted(int(tile) for tile in fields.split(',')) \
+                    or any(int(garden[str(tile)][TILE_PRODUCT]) != 0 for tile in tiles.keys()):
+                continue
+            for tile_id, (x, y) in tiles.items():
+                tile = list(EMPTY_TILE)
+                tile[TILE_PRODUCT] = product_id
+                tile[TILE_X], tile[TILE_Y] = x, y
+                tile[TILE_HARVEST_TIME] = now + int(product['time'])
+                tile[TILE_SIZE] = '{}x{}'.format(product['sx'], product['sy'])
+                tile[TILE_PLANTED_TIME] = now
+                garden[str(tile_id)] = tile
+            self.__add_to_inventory(product_id, -1)
+            grown.append([int(field), product_id])
+        return json_response({'success': 1 if len(grown) > 0 else 0, 'grow': grown})
+
+    def __water(self, parameters):
+        garden = self.__get_garden_of_request(parameters)
+        now = int(time.time())
+        watered = 0
+        for fields in _get_parameters(parameters, 'felder[]'):
+            tiles = [garden.get(tile) for tile in fields.split(',')]
+            if any(tile is None or int(tile[TILE_PRODUCT]) == 0 for tile in tiles):
+                continue
+            for tile in tiles:
+                tile[TILE_WATERED_TIME] = now
+            watered += 1
+        return json_response({'success': 1 if watered > 0 else 0})
+
+    @staticmethod
+    def __get_tiles(field, sx, sy):
+        """Returns {tile_id: (x, y)} of all tiles of a plant with its position in the plant starting at 1."""
+        x, y = (field - 1) % GARDEN_WIDTH, (field - 1) // GARDEN_WIDTH
+        if x + sx > GARDEN_WIDTH or y + sy > GARDEN_HEIGHT:
+            return {}
+        return {field + dx + dy * GARDEN_WIDTH: (dx + 1, dy + 1) for dy in range(sy) for dx in range(sx)}
+
+    # storage
+    def __add_to_inventory(self, product_id, quantity):
+        quantity += int(self.inventory.get(str(product_id), 0))
+        if quantity <= 0:
+            self.inventory.pop(str(product_id), None)
+            return
+        self.inventory[str(product_id)] = quantity
+        for inventory_data in self.inventory_data.values():
+            self.__sort_into_shelf(inventory_data, product_id)
+
+    def __sort_into_shelf(self, inventory_data, product_id):
+        sort = inventory_data.setdefault('sort', {}).setdefault(self.__get_shelf_type(product_id), [])
+        if str(product_id) not in sort:
+            sort.append(str(product_id))
+
+    def __get_shelf_type(self, product_id):
+        category = self.products.get(product_id, {}).get('category') or ProductType.COINS.value
+        for shelf_type, product_types in PRODUCTTYPE_TO_SHELFTYPE.items():
+            if ProductType(category) in product_types:
+                return shelf_type.value
+        return ShelfType.NORMAL.value
+
+    def __get_inventory(self, parameters):
+        shelf_type = _get_parameter(parameters, 'type', ShelfType.NORMAL.value)
+        if shelf_type not in self.inventory_data:
+            inventory_data = json.loads(json.dumps(DEFAULT_INVENTORY_DATA))
+            for product_id in self.inventory.keys():
+                self.__sort_into_shelf(inventory_data, int(product_id))
+            self.inventory_data[shelf_type] = inventory_data
+        return json_response({**self.inventory_data[shelf_type], 'produkte': self.inventory})
+
+    # marketplace
+    def __get_market_page(self, parameters):
+        product_id = int(_get_parameter(parameters, 'v'))
+        page = int(_get_parameter(parameters, 'page', 1))
+        offers = self.offers.get(product_id, [])
+        last_page = max(1, (len(offers) + MARKET_PAGE_SIZE - 1) // MARKET_PAGE_SIZE)
+        name = self.products.get(product_id, {}).get('name', str(product_id))
+
+        rows = ['<tr><th>Anzahl</th><th>Produkt</th><th>Verkäufer</th><th>Preis</th><th></th></tr>']
+        page_offers = offers[(page - 1) * MARKET_PAGE_SIZE:page * MARKET_PAGE_SIZE]
+        for offer in page_offers:
+            buy = ''
+            if offer.id is not None:
+                buy = '<a onclick="buy(\'{}\',\'{}\',\'{}\')">kaufen</a>'.format(offer.id, offer.amount, offer.price)
+            rows.append('<tr><td>{}</td><td><a>{}</a></td><td><a>{}</a></td><td>{} wT</td><td>{}</td></tr>'.format(
+                _format_number(offer.amount, 0), escape(name), escape(str(offer.seller)), _format_number(offer.price, 2), buy))
+        if len(page_offers) == 0:
+            rows.append('<tr><td>Keine Angebote</td></tr>')
+
+        link = '<a href="markt.php?order=p&amp;v={}&amp;filter=1&amp;page={}">{}</a>'
+        pagination = []
+        if page > 1:
+            pagination.append(link.format(product_id, page - 1, 'zurück'))
+        if page < last_page:
+            pagination.append(link.format(product_id, page + 1, 'weiter'))
+            pagination.append(link.format(product_id, last_page, last_page))
+        rows.append('<tr><td colspan="5">{}</td></tr>'.format(' '.join(pagination)))
+        return html_response('<html><body><div><table>{}</table></div></body></html>'.format(''.join(rows)))
+
+    def __buy(self, parameters):
+        product_id = int(_get_parameter(parameters, 'v'))
+        offer_id = _get_parameter(parameters, 'buy_id')
+        offers = self.offers.get(product_id, [])
+        for i, offer in enumerate(offers):
+            if offer.id != offer_id:
+                continue
+            quantity = min(int(_get_parameter(parameters, 'buy_menge')), offer.amount)
+            price = quantity * offer.price
+            if price > float(self.user_data['bar_unformat']):
+                break
+            self.user_data['bar_unformat'] = float(self.user_data['bar_unformat']) - price
+            self.__add_to_inventory(product_id, quantity)
+            if quantity == offer.amount:
+                del offers[i]
+            else:
+                offers[i] = offer._replace(amount=offer.amount - quantity)
+            break
+        return self.__get_market_page([('v', product_id), ('page', _get_parameter(parameters, 'page', 1))])
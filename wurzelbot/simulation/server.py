@@ -0,0 +1,154 @@
+"""
+Stand-in game server. Requests of the core endpoints are answered by the simulated GameState, all other requests are
+answered with the recorded responses of a recording made with WURZELBOT_RECORD_FILE.
+"""
+import argparse
+import gzip
+import logging
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from wurzelbot.communication.endpoints import get_endpoint_name
+from wurzelbot.communication.recorder import read_recording
+from .game_state import GameState, Response
+
+# parameters that change with every session, they are ignored when recorded requests are matched
+VOLATILE_PARAMETERS = {'token', 'cid'}
+GZIP_MIN_SIZE = 1024  # smaller responses are sent uncompressed
+
+
+def _get_parameters(query, body):
+    return parse_qsl(query, keep_blank_values=True) + parse_qsl(body or '', keep_blank_values=True)
+
+
+def _get_request_key(method, path, parameters):
+    return method, path, tuple(sorted((key, value) for key, value in parameters if key not in VOLATILE_PARAMETERS))
+
+
+def load_exchanges(file_path):
+    """Reads a recording and adds the path and the parameters of the query and the body to every exchange."""
+    exchanges = read_recording(file_path)
+    for exchange in exchanges:
+        url = urlsplit(exchange['url'])
+        exchange['path'] = url.path.lstrip('/')
+        exchange['parameters'] = _get_parameters(url.query, exchange['body'])
+    return exchanges
+
+
+class Replay:
+    """
+    Recorded responses by request. Repeated requests get the recorded responses in the order they were recorded,
+    afterwards the last response is repeated.
+    """
+
+    def __init__(self, exchanges=()):
+        self.__responses = {}
+        self.__positions = {}
+        self.__lock = threading.Lock()
+        for exchange in exchanges:
+            key = _get_request_key(exchange['method'], exchange['path'], exchange['parameters'])
+            self.__responses.setdefault(key, []).append(exchange)
+
+    def get_response(self, method, path, parameters):
+        """Returns the recorded Response of a request or None if the request wasn't recorded."""
+        key = _get_request_key(method, path, parameters)
+        with self.__lock:
+            responses = self.__responses.get(key)
+            if responses is None:
+                return None
+            position = self.__positions.get(key, 0)
+            self.__positions[key] = min(position + 1, len(responses) - 1)
+        exchange = responses[position]
+        return Response(exchange['status'], exchange['headers'], exchange['content'])
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local HTTP server, which stands in for the game servers. The bot uses it if its base url is set to base_url."""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, exchanges=()):
+        super().__init__(server_address, _RequestHandler)
+        self.base_url = 'http://{}:{}/'.format(*self.server_address[:2])
+        self.state = GameState(self.base_url, exchanges)
+        self.replay = Replay(exchanges)
+
+    def respond(self, method, path, query, parameters):
+        endpoint = get_endpoint_name(path + '?' + query)
+        response = self.state.handle(endpoint, method, parameters)
+        if response is None:
+            response = self.replay.get_response(method, path, parameters)
+        if response is None:
+            logging.warning('no recorded response for {} {}?{}'.format(method, path, query))
+            response = Response(404, {'Content-Type': 'text/plain'}, b'not recorded')
+        return response
+
+    def serve_in_background(self):
+        """Serves requests in a daemon thread, e.g. for tests and benchmarks in the same process."""
+        thread = threading.Thread(target=self.serve_forever, name='stand-in-server', daemon=True)
+        thread.start()
+        return thread
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    # keeps connections alive like the game servers
+    protocol_version = 'HTTP/1.1'
+    # headers and content are written separately, which would be delayed by Nagle's algorithm
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.__handle('GET')
+
+    def do_POST(self):
+        self.__handle('POST')
+
+    def __handle(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('UTF-8') if length > 0 else None
+        response = self.server.respond(method, url.path.lstrip('/'), url.query, _get_parameters(url.query, body))
+
+        content = response.content
+        compressed = len(content) >= GZIP_MIN_SIZE and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if compressed:
+            content = gzip.compress(content)
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            # headers like Set-Cookie can be sent multiple times
+            for single_value in value if isinstance(value, list) else [value]:
+                self.send_header(name, single_value)
+        if compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in game server for offline runs of the wurzelbot.')
+    parser.add_argument('recording', nargs='?', help='file recorded with WURZELBOT_RECORD_FILE')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--debug', action='store_true', help='log every request')
+    args = parser.parse_args()
+
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if args.debug else logging.INFO, format='%(message)s')
+    exchanges = load_exchanges(args.recording) if args.recording is not None else []
+    server = StandInServer((args.host, args.port), exchanges)
+    logging.info('stand-in game server with {} recorded responses runs at {}'.format(len(exchanges), server.base_url))
+    logging.info('start the bot with WURZELBOT_BASE_URL={} to use it'.format(server.base_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,11 +6,13 @@ from wurzelbot.gardens.gardens import GardenManager
 from wurzelbot.product.product_data import ProductData
 from wurzelbot.account_data import AccountData
 from wurzelbot.utils.singelton_type import SingletonType
+from .order_book import OrderBook
 
 
 class Market(metaclass=SingletonType):
     """Data collection for every place where trading is done"""
     PRICE_CACHE_TIME = datetime.timedelta(minutes=10).total_seconds()
+    ORDER_BOOK_CACHE_TIME = datetime.timedelta(minutes=1).total_seconds()
 
     def __init__(self):
         self.wimp_data = {}
@@ -18,9 +20,13 @@ class Market(metaclass=SingletonType):
         # {product: (sell_price, up-to-date_until) }
         self._product_prices = {}
         self._products_ordered_by_profitability = None
+        # {product: OrderBook}
+        self._order_books = {}
 
     def load_wimp_data(self):
-        for garden in GardenManager().gardens:
+        # wimps are loaded per active garden. Starting with the already active garden saves one garden change.
+        active_garden = HTTPConnection().get_active_garden()
+        for garden in sorted(GardenManager().gardens, key=lambda garden: garden.garden_id != active_garden):
             self.wimp_data.update({garden.garden_id: HTTPConnection().get_wimps_data(garden.garden_id)})
 
     def dispose_profitability(self):
@@ -71,17 +77,42 @@ class Market(metaclass=SingletonType):
         return sell_price
 
     def get_cheapest_offer(self, product):
-        offers = self.get_offers_for(product)
+        # usually only the first page is loaded
+        offer = next(self.iter_offers_for(product), None)
 
-        if len(offers) > 0:
-            return offers[0][1]
+        if offer is not None:
+            return offer.price
         return None
 
     def get_offers_for(self, product, exclude_own=True):
         if not product.is_tradable:
             raise AttributeError(f'product {product}({product.id}) is not tradeable and doesn\'t have offers')
 
-        result = HTTPConnection().get_offers_from_product(product.id)
+        result = self.get_order_book(product).get_offers()
         if exclude_own:
-            return [item for item in result if item[2] != AccountData.user_name]
+            return [item for item in result if item.seller != AccountData().user_name]
         return result
+
+    def iter_offers_for(self, product, exclude_own=True):
+        """
+        Returns the offers of a product ordered by price. The pages of the marketplace are loaded lazily, so stop
+        iterating as soon as enough offers were found.
+        """
+        if not product.is_tradable:
+            raise AttributeError(f'product {product}({product.id}) is not tradeable and doesn\'t have offers')
+
+        for offer in self.get_order_book(product):
+            if not exclude_own or offer.seller != AccountData().user_name:
+                yield offer
+
+    def get_order_book(self, product):
+        """Returns the order book of a product, which is shared by all price lookups and purchases until it expires."""
+        order_book = self._order_books.get(product)
+        if order_book is None or not order_book.is_valid():
+            order_book = OrderBook(product.id, self.ORDER_BOOK_CACHE_TIME)
+            self._order_books[product] = order_book
+        return order_book
+
+    def dispose_order_book(self, product):
+        """Must be called after buying or selling a product, because its offers changed."""
+        self._order_books.pop(product, None)
@@ -0,0 +1,48 @@
+import time
+
+from wurzelbot.communication.http_communication import HTTPConnection
+
+
+class OrderBook:
+    """
+    Offers of a product on the marketplace ordered by price. The pages are loaded lazily and every page is only loaded
+    once, so buying and pricing can use the same offers until the order book expires.
+    """
+
+    def __init__(self, product_id, expiration_time):
+        """
+        @param expiration_time: seconds the offers stay valid
+        """
+        self.product_id = product_id
+        self.__valid_until = time.time() + expiration_time
+        self.__offers = []
+        self.__pages = None
+        self.__complete = False
+
+    def is_valid(self):
+        return time.time() < self.__valid_until
+
+    def __iter__(self):
+        """Returns the offers ordered by price and loads further pages only if the loaded offers are used up."""
+        i = 0
+        while True:
+            if i < len(self.__offers):
+                yield self.__offers[i]
+                i += 1
+                continue
+            if self.__complete:
+                return
+            if self.__pages is None:
+                self.__pages = HTTPConnection().iter_offers_from_product(self.product_id)
+            offer = next(self.__pages, None)
+            if offer is None:
+                self.__complete = True
+                return
+            self.__offers.append(offer)
+
+    def get_offers(self):
+        """Returns all offers. If no page is loaded yet, all pages are loaded concurrently."""
+        if not self.__complete and self.__pages is None:
+            self.__offers = HTTPConnection().get_offers_from_product(self.product_id)
+            self.__complete = True
+        return list(self)
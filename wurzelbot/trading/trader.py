@@ -86,10 +86,10 @@ class Trader:
         Trader.make_space_in_storage_for_products([product])
 
         buying_protocol = {}
-        offers = HTTPConnection().get_cheapest_offers_for(product)
         rest_quantity = quantity
-        for offer in offers:
-            if product.buy_in_shop is not None and offer.get('price') > product.price_npc:
+        # the offers are loaded page by page until enough is bought
+        for offer in Market().iter_offers_for(product):
+            if product.buy_in_shop is not None and offer.price > product.price_npc:
                 buy_quantity = rest_quantity
                 if money < product.price_npc * buy_quantity:
                     buy_quantity = int(money / product.price_npc)
@@ -97,14 +97,18 @@ class Trader:
                     HTTPConnection().buy_from_shop(product.buy_in_shop.value, product.id, buy_quantity)
                     money -= product.price_npc * buy_quantity
                     rest_quantity -= buy_quantity
-                    if buying_protocol.get(offer.get('price')) is None:
-                        buying_protocol[offer.get('price')] = buy_quantity
+                    if buying_protocol.get(offer.price) is None:
+                        buying_protocol[offer.price] = buy_quantity
                     else:
-                        buying_protocol[offer.get('price')] += buy_quantity
+                        buying_protocol[offer.price] += buy_quantity
                 break
 
-            offer_amount = offer.get('amount')
-            offer_price = offer.get('price')
+            # offers without a buy link, like own offers, can't be bought
+            if offer.id is None:
+                continue
+
+            offer_amount = offer.amount
+            offer_price = offer.price
             buy_quantity = rest_quantity
             if offer_amount < rest_quantity:
                 buy_quantity = offer_amount
@@ -120,6 +124,7 @@ class Trader:
                 break
 
         bought_quantity = quantity - rest_quantity
+        Market().dispose_order_book(product)
 
         HTTPConnection().cancel_all_contracts()
 
@@ -136,6 +141,7 @@ class Trader:
     def sell_to_marketplace(product, quantity, price):
         price = round(price, 2)
         HTTPConnection().sell_to_marketplace(product, quantity, price)
+        Market().dispose_order_book(product)
 
         logging.info("sold {} {} for {}".format(quantity, product, price))
 